@@ -0,0 +1,176 @@
+import re
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+# FTS5 index over saved aliens, one row per saved_alien with rowid = alien id.
+# `owner` holds "u<user_id>" as an indexed token so a user's matches come
+# straight from the index instead of filtering everyone's matches afterwards.
+SEARCH_COLUMNS = ('owner', 'name', 'scientific_name', 'description', 'traits', 'abilities', 'planet_name')
+# bm25 weight per column, in SEARCH_COLUMNS order: names count most, the owner token not at all
+COLUMN_WEIGHTS = (0.0, 10.0, 5.0, 1.0, 2.0, 2.0, 3.0)
+# Most matches a search ranks and counts; beyond it only the newest are ranked
+MAX_RANKED = 1000
+
+_ROW_VALUES = """
+    'u' || {row}.user_id,
+    json_extract({row}.alien_data, '$.name'),
+    json_extract({row}.alien_data, '$.scientificName'),
+    json_extract({row}.alien_data, '$.description'),
+    json_extract({row}.alien_data, '$.physicalTraits'),
+    json_extract({row}.alien_data, '$.abilities'),
+    {row}.planet_name
+"""
+
+_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE alien_search USING fts5(
+        {', '.join(SEARCH_COLUMNS)},
+        tokenize = 'porter unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS saved_alien_search_insert AFTER INSERT ON saved_alien BEGIN
+        INSERT INTO alien_search (rowid, {', '.join(SEARCH_COLUMNS)}) VALUES (new.id, {_ROW_VALUES.format(row='new')});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS saved_alien_search_delete AFTER DELETE ON saved_alien BEGIN
+        DELETE FROM alien_search WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS saved_alien_search_update
+        AFTER UPDATE OF user_id, planet_name, alien_data ON saved_alien BEGIN
+        DELETE FROM alien_search WHERE rowid = old.id;
+        INSERT INTO alien_search (rowid, {', '.join(SEARCH_COLUMNS)}) VALUES (new.id, {_ROW_VALUES.format(row='new')});
+    END""",
+]
+
+_PLANET_NUMBER = "CAST(json_extract({row}planet_data, '$.{field}') AS REAL)"
+
+# Expression indexes let planet filters without a text query seek within the user's aliens
+_SCHEMA += [
+    f"CREATE INDEX IF NOT EXISTS ix_saved_alien_{field} ON saved_alien "
+    f"(user_id, {_PLANET_NUMBER.format(row='', field=field)})"
+    for field in ('gravity', 'temperature')
+]
+
+# Planet numerics and survival scores that can be filtered on, by parameter prefix.
+# The planet expressions must match the indexes above for SQLite to use them.
+_FILTERS = {
+    'gravity': _PLANET_NUMBER.format(row='s.', field='gravity'),
+    'temperature': _PLANET_NUMBER.format(row='s.', field='temperature'),
+    # Best survival score over the alien's explorations; uses the saved_alien_id index
+    'score': '(SELECT MAX(e.survival_score) FROM environment_exploration e WHERE e.saved_alien_id = s.id)',
+}
+
+
+def search_index_exists(conn):
+    """Whether the FTS5 table has been created in this database"""
+    return conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alien_search'"
+    )).first() is not None
+
+
+def create_search_index(engine):
+    """Create the FTS5 table and its sync triggers, backfilling existing aliens.
+
+    Triggers keep the index in step with every insert, update and delete on
+    saved_alien. Returns False when this SQLite build has no FTS5.
+    """
+    with engine.begin() as conn:
+        exists = search_index_exists(conn)
+        try:
+            for statement in _SCHEMA[0 if not exists else 1:]:
+                conn.execute(text(statement))
+        except OperationalError as e:
+            print(f'⚠️ Full-text search unavailable: {e}')
+            return False
+        if not exists:
+            conn.execute(text(
+                f"INSERT INTO alien_search (rowid, {', '.join(SEARCH_COLUMNS)}) "
+                f"SELECT s.id, {_ROW_VALUES.format(row='s')} FROM saved_alien s"
+            ))
+    return True
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query: every word must match, as a prefix.
+
+    Quoting each word keeps user input from being read as FTS5 syntax.
+    Returns None when the text has no searchable words.
+    """
+    words = re.findall(r'\w+', query or '')
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_aliens(session, user_id, query=None, filters=None, page=1, per_page=20):
+    """Search one user's saved aliens.
+
+    `filters` may hold gravity_min/max, temperature_min/max and
+    score_min/max (best survival score over the alien's explorations).
+    Matches are ranked by bm25 when there is a query, newest first
+    otherwise. Returns one page of (id, relevance, best_score) rows, the
+    number of matches and whether that number was capped at MAX_RANKED.
+
+    A text query matching more than MAX_RANKED aliens only ranks the
+    newest MAX_RANKED of them, so the bm25 sort stays bounded as the
+    collection grows. Listing without a query pages through every match.
+    """
+    filters = filters or {}
+    params = {'user_id': user_id, 'cap': MAX_RANKED}
+    match = match_expression(query)
+
+    if match:
+        params['match'] = f'owner : "u{user_id}" AND ({match})'
+        source = 'alien_search JOIN saved_alien s ON s.id = alien_search.rowid'
+        conditions = ['alien_search MATCH :match']
+        # bm25 is lower for better matches; flip it so relevance reads naturally
+        relevance = f"-bm25(alien_search, {', '.join(str(w) for w in COLUMN_WEIGHTS)})"
+        order = 'relevance DESC, s.id DESC'
+        # FTS5 walks its doclists backwards for this order, so there is no sort
+        count_order = 'ORDER BY alien_search.rowid DESC'
+    else:
+        source = 'saved_alien s'
+        conditions = ['s.user_id = :user_id']
+        relevance = 'NULL'
+        # Ids grow with created_at; walking the user_id index backwards needs no sort
+        order = 's.id DESC'
+        # Only counted, so let SQLite pick the planet filter indexes over id order
+        count_order = ''
+
+    for name, expression in _FILTERS.items():
+        for bound, operator in (('min', '>='), ('max', '<=')):
+            value = filters.get(f'{name}_{bound}')
+            if value is not None:
+                params[f'{name}_{bound}'] = value
+                conditions.append(f'{expression} {operator} :{name}_{bound}')
+    where = ' AND '.join(conditions)
+
+    # One pass over at most MAX_RANKED + 1 matches counts them and, for a text query
+    # taking them newest first, finds the first one left out of the ranking
+    total, floor = session.execute(
+        text(f"""
+            SELECT COUNT(*), MIN(id) FROM (
+                SELECT s.id AS id FROM {source} WHERE {where} {count_order} LIMIT :cap + 1
+            )
+        """),
+        params
+    ).one()
+    capped = total > MAX_RANKED
+    if capped:
+        total = MAX_RANKED
+        if match:
+            # Rank only the newest MAX_RANKED matches
+            params['floor'] = floor
+            where += ' AND alien_search.rowid > :floor'
+
+    params.update(limit=per_page, offset=(page - 1) * per_page)
+    rows = session.execute(
+        text(f"""
+            SELECT s.id, {relevance} AS relevance, {_FILTERS['score']} AS best_score
+            FROM {source}
+            WHERE {where}
+            ORDER BY {order}
+            LIMIT :limit OFFSET :offset
+        """),
+        params
+    ).mappings().all()
+    return rows, total, capped
@@ -1,10 +1,30 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for, session, flash
+from flask import Flask, render_template, jsonify, request, redirect, url_for, session, flash, make_response, send_file
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
+import hashlib
+import math
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import wraps
 from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from bioverse_app import BioVerseApp
+from alien_search import create_search_index, search_aliens, search_index_exists
+from creature_renderer import CreatureImageCache
+from rate_limiter import RateLimitExceeded
+from request_profiler import RequestProfiler
+from similarity_index import SimilarityIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows has no gunicorn workers starting in parallel, so no lock is needed
+    fcntl = None
 
 # Load environment variables
 load_dotenv()
@@ -13,14 +33,56 @@ app = Flask(__name__, static_folder='static', template_folder='templates')
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///users.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Each request thread and image job can hold a connection while it waits on an upstream,
+# so give the pool one per thread instead of SQLAlchemy's default 5 + 10 overflow
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': int(os.getenv('GUNICORN_THREADS', 32)) + int(os.getenv('IMAGE_JOB_WORKERS', 4)),
+    'max_overflow': 4,
+}
+
+# Opt-in request profiling (PROFILING_ENABLED=1); registered first so it times every other hook
+request_profiler = RequestProfiler(os.path.join(app.instance_path, 'profiles'))
+request_profiler.init_app(app)
 
 # Initialize extensions
 db = SQLAlchemy(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
-# Initialize BioVerse app
-bioverse_app = BioVerseApp()
+# BioVerse app is created on first use, or before fork by create_app() when preloading
+_bioverse_app = None
+_bioverse_app_lock = threading.Lock()
+
+def get_bioverse_app():
+    """Return the shared BioVerseApp, constructing it on first call"""
+    global _bioverse_app
+    if _bioverse_app is None:
+        with _bioverse_app_lock:
+            if _bioverse_app is None:
+                _bioverse_app = BioVerseApp()
+    return _bioverse_app
+
+# Procedurally rendered creature images, shown until the real image is ready
+creature_cache = CreatureImageCache(os.path.join(app.instance_path, 'creatures'))
+
+# Background image generation; created on first use so forked workers each get their own threads
+_image_executor = None
+_image_executor_lock = threading.Lock()
+
+def get_image_executor():
+    """Return the thread pool that generates real images after create_alien has answered"""
+    global _image_executor
+    if _image_executor is None:
+        with _image_executor_lock:
+            if _image_executor is None:
+                _image_executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv('IMAGE_JOB_WORKERS', 4)),
+                    thread_name_prefix='image-job'
+                )
+    return _image_executor
+
+# Similar-alien index, loaded from disk on first use
+similarity_index = SimilarityIndex(os.path.join(app.instance_path, 'similarity_index.pkl'))
 
 # User Model
 class User(UserMixin, db.Model):
@@ -50,7 +112,7 @@ class ExtremeEnvironment(db.Model):
 # Saved Alien Model
 class SavedAlien(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     planet_name = db.Column(db.String(100), nullable=False)
     planet_data = db.Column(db.JSON)
     alien_data = db.Column(db.JSON)
@@ -61,7 +123,7 @@ class SavedAlien(db.Model):
 # Environment Exploration Model
 class EnvironmentExploration(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    saved_alien_id = db.Column(db.Integer, db.ForeignKey('saved_alien.id'), nullable=False)
+    saved_alien_id = db.Column(db.Integer, db.ForeignKey('saved_alien.id'), nullable=False, index=True)
     environment_id = db.Column(db.Integer, db.ForeignKey('extreme_environment.id'), nullable=False)
     survival_analysis = db.Column(db.JSON)
     narrative_outcome = db.Column(db.Text)
@@ -70,6 +132,168 @@ class EnvironmentExploration(db.Model):
     
     environment = db.relationship('ExtremeEnvironment')
 
+# Image Job Model: a real image being generated in the background for a created alien
+class ImageJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, completed, failed
+    image_url = db.Column(db.String(500))
+    # Set when the alien is saved before its image is ready, so the finished image reaches the saved copy
+    saved_alien_id = db.Column(db.Integer, db.ForeignKey('saved_alien.id'))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+
+# Idempotency Key Model: the stored outcome of a request sent with an Idempotency-Key header
+class IdempotencyKey(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    endpoint = db.Column(db.String(100), nullable=False)
+    key = db.Column(db.String(100), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='in_progress')  # in_progress, completed
+    response_code = db.Column(db.Integer)
+    response_body = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    __table_args__ = (db.UniqueConstraint('user_id', 'endpoint', 'key'),)
+
+IDEMPOTENCY_TTL = timedelta(hours=float(os.getenv('IDEMPOTENCY_TTL_HOURS', 24)))
+# How long a retry waits for the original request, and when an unfinished one counts as abandoned
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', 120))
+IDEMPOTENCY_ABANDONED_AFTER = timedelta(seconds=float(os.getenv('IDEMPOTENCY_ABANDONED_SECONDS', 300)))
+_idempotency_purged_at = 0.0
+
+def _purge_expired_idempotency_keys():
+    """Drop expired keys, at most once a minute per process"""
+    global _idempotency_purged_at
+    if time.monotonic() - _idempotency_purged_at < 60:
+        return
+    _idempotency_purged_at = time.monotonic()
+    IdempotencyKey.query.filter(IdempotencyKey.expires_at < datetime.utcnow()).delete()
+    db.session.commit()
+
+def _replay_idempotent(record):
+    response = make_response(jsonify(record.response_body), record.response_code)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def _claim_idempotency_key():
+    """Claim the request's Idempotency-Key.
+
+    Returns ('run', record_id) when this request should do the work,
+    ('wait', record_id) when another request with the key is in flight,
+    ('done', response) when the outcome is already known, or
+    ('run', None) when no key was sent.
+    """
+    key = request.headers.get('Idempotency-Key', '').strip()
+    if not key:
+        return 'run', None
+    if len(key) > 100:
+        return 'done', (jsonify({'error': 'Idempotency-Key must be at most 100 characters'}), 400)
+    
+    _purge_expired_idempotency_keys()
+    request_hash = hashlib.sha256(request.get_data()).hexdigest()
+    now = datetime.utcnow()
+    
+    for _ in range(2):
+        record = IdempotencyKey(
+            user_id=current_user.id,
+            endpoint=request.endpoint,
+            key=key,
+            request_hash=request_hash,
+            expires_at=now + IDEMPOTENCY_TTL
+        )
+        db.session.add(record)
+        try:
+            db.session.commit()
+            return 'run', record.id
+        except IntegrityError:
+            db.session.rollback()
+        
+        existing = IdempotencyKey.query.filter_by(
+            user_id=current_user.id, endpoint=request.endpoint, key=key
+        ).first()
+        if existing is None:
+            continue
+        
+        abandoned = existing.status == 'in_progress' and existing.created_at < now - IDEMPOTENCY_ABANDONED_AFTER
+        if existing.expires_at < now or abandoned:
+            # Expired keys start fresh; so does a request whose worker died mid-flight
+            db.session.delete(existing)
+            db.session.commit()
+            continue
+        
+        if existing.request_hash != request_hash:
+            return 'done', (jsonify({'error': 'Idempotency-Key was already used with a different request'}), 422)
+        if existing.status == 'completed':
+            return 'done', _replay_idempotent(existing)
+        return 'wait', existing.id
+    
+    return 'done', (jsonify({'error': 'Could not claim Idempotency-Key, please retry'}), 409)
+
+def _poll_idempotency_key(record_id):
+    """Return the stored response once the original request finishes, or a status to report"""
+    record = IdempotencyKey.query.populate_existing().get(record_id)
+    if record is None:
+        # The original request failed and released its key
+        return jsonify({'error': 'The original request failed, please retry'}), 409
+    if record.status == 'completed':
+        return _replay_idempotent(record)
+    return None
+
+def _idempotency_timeout():
+    response = make_response(jsonify({'error': 'The original request is still in progress'}), 409)
+    response.headers['Retry-After'] = '5'
+    return response
+
+def _finish_idempotency_key(record_id, rv):
+    """Store a successful outcome for replay; release the key on errors so retries run again"""
+    response = make_response(rv)
+    record = db.session.get(IdempotencyKey, record_id)
+    if record is not None:
+        if response.status_code < 500 and response.status_code != 429 and response.is_json:
+            record.status = 'completed'
+            record.response_code = response.status_code
+            record.response_body = response.get_json()
+        else:
+            db.session.delete(record)
+        db.session.commit()
+    return response
+
+def _release_idempotency_key(record_id):
+    db.session.rollback()
+    IdempotencyKey.query.filter_by(id=record_id).delete()
+    db.session.commit()
+
+def idempotent(view):
+    """Honor an Idempotency-Key header: repeats replay the first response or wait for it.
+
+    Apply it below @login_required.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        action, value = _claim_idempotency_key()
+        if action == 'done':
+            return value
+        if action == 'wait':
+            deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(0.5)
+                response = _poll_idempotency_key(value)
+                if response is not None:
+                    return response
+            return _idempotency_timeout()
+        if value is None:
+            return view(*args, **kwargs)
+        try:
+            rv = view(*args, **kwargs)
+        except BaseException:
+            _release_idempotency_key(value)
+            raise
+        return _finish_idempotency_key(value, rv)
+    return wrapper
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -136,6 +360,7 @@ def dashboard():
 
 @app.route('/api/create-alien', methods=['POST'])
 @login_required
+@idempotent
 def create_alien():
     """Create alien species based on planet name"""
     try:
@@ -146,46 +371,178 @@ def create_alien():
         if not planet_name:
             return jsonify({'error': 'Planet name is required'}), 400
         
+        engine = get_bioverse_app()
+        
+        # Per-user quota, queued briefly so one user cannot starve the others
+        engine.rate_limiter.acquire('user', current_user.id)
+        
         # Analyze planet
         print(f"Analyzing planet: {planet_name}")
-        planet_data = bioverse_app.analyze_planet(planet_name)
+        planet_data = engine.analyze_planet(planet_name)
         print(f"Planet data received: {planet_data}")
         
         # Generate alien
         print(f"Generating alien for planet: {planet_data['name']}")
-        alien_data = bioverse_app.generate_alien(planet_data)
+        alien_data = engine.generate_alien(planet_data)
         print(f"Alien data received: {alien_data}")
         
-        # Stage 4: Generate optimized image prompt using AI
-        print(f"Generating optimized image prompt for alien...")
-        image_prompt = bioverse_app.generate_image_prompt(planet_data, alien_data)
-        print(f"AI-generated image prompt: {image_prompt}")
+        # Stage 4: Render a procedural creature right away
+        image_url = url_for('creature_image', image_hash=creature_cache.get_or_render(alien_data, planet_data))
+        print(f"Procedural image: {image_url}")
         
-        # Stage 5: Generate image using AI-optimized prompt
-        print(f"Generating image with AI-optimized prompt...")
-        image_url = bioverse_app.generate_image(image_prompt)
-        print(f"Image URL received: {image_url}")
+        # Stage 5: Generate the real image in the background; the page swaps it in when ready
+        image_job_id = None
+        if engine.image_generation_configured():
+            image_job = ImageJob(user_id=current_user.id)
+            db.session.add(image_job)
+            db.session.commit()
+            image_job_id = image_job.id
+            get_image_executor().submit(run_image_job, image_job_id, planet_data, alien_data)
+            print(f"Queued image job {image_job_id}")
         
         # Return all data
         result = {
             'planet': planet_data,
             'alien': alien_data,
-            'image': image_url
+            'image': image_url,
+            'image_job': image_job_id
         }
         print(f"Returning result: {result}")
         return jsonify(result), 200
         
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
     except Exception as e:
         print(f"Error in create_alien endpoint: {e}")
         return jsonify({'error': str(e)}), 500
 
+def run_image_job(job_id, planet_data, alien_data):
+    """Generate the real image for a created alien and record it on the job (runs on the image pool)"""
+    with app.app_context():
+        image_url = None
+        try:
+            engine = get_bioverse_app()
+            image_prompt = engine.generate_image_prompt(planet_data, alien_data)
+            image_url = engine.generate_image(image_prompt)
+            if image_url == engine.PLACEHOLDER_IMAGE_URL:
+                # The procedural image beats the generic placeholder, so keep it
+                image_url = None
+        except Exception as e:
+            print(f'❌ Image job {job_id} failed: {e}')
+        
+        try:
+            job = db.session.get(ImageJob, job_id)
+            job.status = 'completed' if image_url else 'failed'
+            job.image_url = image_url
+            job.completed_at = datetime.utcnow()
+            db.session.commit()
+            # Read the link after committing, so a save that raced with us is seen by one side or the other
+            if image_url and job.saved_alien_id:
+                SavedAlien.query.filter_by(id=job.saved_alien_id).update({'image_url': image_url})
+                db.session.commit()
+            print(f'🖼️ Image job {job_id} {job.status}')
+        except Exception as e:
+            print(f'❌ Could not record image job {job_id}: {e}')
+        finally:
+            db.session.remove()
+
+@app.route('/creatures/<image_hash>.svg')
+def creature_image(image_hash):
+    """Serve a rendered creature; the content hash in the URL makes it safe to cache forever"""
+    if not re.fullmatch(r'[0-9a-f]{32}', image_hash) or not os.path.exists(creature_cache.path(image_hash)):
+        return jsonify({'error': 'Image not found'}), 404
+    return send_file(creature_cache.path(image_hash), mimetype='image/svg+xml', max_age=31536000)
+
+@app.route('/api/image-jobs/<int:job_id>')
+@login_required
+def get_image_job(job_id):
+    """Status of a background image job started by create-alien"""
+    job = ImageJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    status = job.status
+    # Jobs lost to a worker restart never finish; stop clients polling them
+    timeout = timedelta(seconds=float(os.getenv('IMAGE_JOB_TIMEOUT_SECONDS', 600)))
+    if status == 'pending' and job.created_at < datetime.utcnow() - timeout:
+        status = 'failed'
+    return jsonify({'id': job.id, 'status': status, 'image_url': job.image_url}), 200
+
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'Flask server is running'})
 
+# Upstream probes are cached so frequent readiness polling does not hit the providers
+_upstream_checks = {'checked_at': 0.0, 'result': {}}
+
+@app.route('/api/ready')
+def readiness_check():
+    """Readiness probe: the database answers and at least one LLM provider is reachable"""
+    checks = {}
+    try:
+        db.session.execute(text('SELECT 1'))
+        checks['database'] = True
+    except Exception as e:
+        print(f'Readiness database check failed: {e}')
+        checks['database'] = False
+    
+    cache_seconds = float(os.getenv('READY_CACHE_SECONDS', 10))
+    if time.monotonic() - _upstream_checks['checked_at'] > cache_seconds:
+        _upstream_checks['result'] = get_bioverse_app().check_upstreams()
+        _upstream_checks['checked_at'] = time.monotonic()
+    checks.update(_upstream_checks['result'])
+    
+    # Image generation has a placeholder fallback, so it does not gate readiness
+    llm_reachable = any(ok for name, ok in checks.items() if name.startswith('llm:'))
+    ready = checks['database'] and llm_reachable
+    return jsonify({'ready': ready, 'checks': checks}), 200 if ready else 503
+
+@app.route('/api/rate-limits')
+@login_required
+def rate_limit_stats():
+    """Rate limiter counters and wait times shared across all workers"""
+    return jsonify(get_bioverse_app().rate_limiter.stats()), 200
+
+@app.route('/api/llm-providers')
+@login_required
+def llm_provider_stats():
+    """Latency, health and hedging counters for the LLM provider pool"""
+    return jsonify(get_bioverse_app().llm_pool.stats()), 200
+
+@app.route('/api/admin/profiles')
+def list_profiles():
+    """Slowest recent request profiles; requires the X-Profile-Token header"""
+    if not request_profiler.enabled:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not request_profiler.is_authorized(request.headers.get(RequestProfiler.TOKEN_HEADER)):
+        return jsonify({'error': 'Invalid profiling token'}), 403
+    
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+    profiles = request_profiler.slowest(limit, endpoint=request.args.get('endpoint'))
+    for profile in profiles:
+        profile['url'] = url_for('get_profile', profile_id=profile['id'])
+    return jsonify({'profiles': profiles}), 200
+
+@app.route('/api/admin/profiles/<profile_id>')
+def get_profile(profile_id):
+    """Download one profile as collapsed stacks for flamegraph.pl or speedscope"""
+    if not request_profiler.enabled:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not request_profiler.is_authorized(request.headers.get(RequestProfiler.TOKEN_HEADER)):
+        return jsonify({'error': 'Invalid profiling token'}), 403
+    
+    path = request_profiler.collapsed_path(profile_id)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, mimetype='text/plain', as_attachment=True, download_name=f'{profile_id}.collapsed')
+
+def rate_limited_response(error):
+    """Build a 429 response telling the client when to retry"""
+    response = jsonify({'error': 'Too many requests, please try again shortly'})
+    response.headers['Retry-After'] = str(max(1, math.ceil(error.retry_after)))
+    return response, 429
+
 @app.route('/api/save-alien', methods=['POST'])
 @login_required
+@idempotent
 def save_alien():
     """Save generated alien to user's collection"""
     try:
@@ -202,6 +559,27 @@ def save_alien():
         db.session.add(saved_alien)
         db.session.commit()
         
+        # Saved before the real image finished: use it if it has landed, otherwise let the job fill it in
+        image_job_id = data.get('image_job')
+        if image_job_id:
+            image_job = ImageJob.query.filter_by(id=image_job_id, user_id=current_user.id).first()
+            if image_job is not None:
+                image_job.saved_alien_id = saved_alien.id
+                db.session.commit()
+                db.session.refresh(image_job)
+                if image_job.status == 'completed' and image_job.image_url:
+                    saved_alien.image_url = image_job.image_url
+                    db.session.commit()
+        
+        # Keep the similarity index current; a worker that has not loaded it yet catches up on first query
+        if similarity_index.loaded:
+            try:
+                similarity_index.add(saved_alien.id, saved_alien.user_id, saved_alien.alien_data, saved_alien.planet_data)
+                if similarity_index.needs_save:
+                    save_similarity_index_async()
+            except Exception as e:
+                print(f'Similarity index update failed: {e}')
+        
         return jsonify({
             'success': True,
             'alien_id': saved_alien.id,
@@ -214,19 +592,51 @@ def save_alien():
 @app.route('/api/saved-aliens')
 @login_required
 def get_saved_aliens():
-    """Get user's saved aliens"""
+    """Get user's saved aliens, optionally with exploration stats (?include_stats=1)"""
     try:
-        aliens = SavedAlien.query.filter_by(user_id=current_user.id)\
+        if request.args.get('include_stats', '').lower() not in ('1', 'true', 'yes'):
+            aliens = SavedAlien.query.filter_by(user_id=current_user.id)\
+                .order_by(SavedAlien.created_at.desc()).all()
+            
+            return jsonify([{
+                'id': alien.id,
+                'planet_name': alien.planet_name,
+                'planet_data': alien.planet_data,
+                'alien_data': alien.alien_data,
+                'image_url': alien.image_url,
+                'created_at': alien.created_at.isoformat()
+            } for alien in aliens]), 200
+        
+        # Aggregate every alien's explorations in one grouped query instead of one request per alien
+        stats = db.session.query(
+            EnvironmentExploration.saved_alien_id.label('alien_id'),
+            db.func.count(EnvironmentExploration.id).label('exploration_count'),
+            db.func.max(EnvironmentExploration.survival_score).label('best_score'),
+            db.func.avg(EnvironmentExploration.survival_score).label('average_score'),
+            db.func.max(EnvironmentExploration.explored_at).label('last_explored_at')
+        ).join(SavedAlien, SavedAlien.id == EnvironmentExploration.saved_alien_id)\
+            .filter(SavedAlien.user_id == current_user.id)\
+            .group_by(EnvironmentExploration.saved_alien_id).subquery()
+        
+        rows = db.session.query(SavedAlien, stats)\
+            .outerjoin(stats, stats.c.alien_id == SavedAlien.id)\
+            .filter(SavedAlien.user_id == current_user.id)\
             .order_by(SavedAlien.created_at.desc()).all()
         
         return jsonify([{
-            'id': alien.id,
-            'planet_name': alien.planet_name,
-            'planet_data': alien.planet_data,
-            'alien_data': alien.alien_data,
-            'image_url': alien.image_url,
-            'created_at': alien.created_at.isoformat()
-        } for alien in aliens]), 200
+            'id': row.SavedAlien.id,
+            'planet_name': row.SavedAlien.planet_name,
+            'planet_data': row.SavedAlien.planet_data,
+            'alien_data': row.SavedAlien.alien_data,
+            'image_url': row.SavedAlien.image_url,
+            'created_at': row.SavedAlien.created_at.isoformat(),
+            'exploration_stats': {
+                'count': row.exploration_count or 0,
+                'best_score': row.best_score,
+                'average_score': round(float(row.average_score), 1) if row.average_score is not None else None,
+                'last_explored_at': row.last_explored_at.isoformat() if row.last_explored_at else None
+            }
+        } for row in rows]), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -252,6 +662,7 @@ def get_environments():
 
 @app.route('/api/explore-environment', methods=['POST'])
 @login_required
+@idempotent
 def explore_environment():
     """Explore how an alien would survive in an extreme environment"""
     try:
@@ -263,8 +674,11 @@ def explore_environment():
         alien = SavedAlien.query.get_or_404(alien_id)
         environment = ExtremeEnvironment.query.get_or_404(environment_id)
         
+        engine = get_bioverse_app()
+        engine.rate_limiter.acquire('user', current_user.id)
+        
         # Generate survival analysis using AI
-        survival_analysis = bioverse_app.analyze_survival(
+        survival_analysis = engine.analyze_survival(
             alien.alien_data,
             environment
         )
@@ -297,6 +711,8 @@ def explore_environment():
             }
         }), 200
         
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -331,6 +747,155 @@ def get_alien_explorations(alien_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def sync_similarity_index():
+    """Load the similarity index and add aliens saved since, including by other workers.
+
+    Returns the number of aliens added. The watermark only moves here, so
+    ids other workers saved between this worker's own saves are still found.
+    """
+    if not similarity_index.loaded:
+        similarity_index.load()
+    
+    ids = db.session.scalars(
+        db.select(SavedAlien.id).where(SavedAlien.id > similarity_index.synced_id).order_by(SavedAlien.id)
+    ).all()
+    missing = similarity_index.missing(ids)
+    
+    added = 0
+    for start in range(0, len(missing), 500):
+        rows = db.session.query(
+            SavedAlien.id, SavedAlien.user_id, SavedAlien.alien_data, SavedAlien.planet_data
+        ).filter(SavedAlien.id.in_(missing[start:start + 500])).all()
+        for row in rows:
+            similarity_index.add(*row)
+            added += 1
+    if ids:
+        similarity_index.mark_synced(ids[-1])
+    
+    if added:
+        print(f'Similarity index caught up with {added} aliens ({len(similarity_index)} total)')
+    return added
+
+_similarity_save_lock = threading.Lock()
+
+def save_similarity_index_async():
+    """Catch up and write the similarity index on a background thread.
+
+    Keeps pickling off the request path; a save already running covers this one.
+    """
+    if not _similarity_save_lock.acquire(blocking=False):
+        return
+    
+    def save():
+        try:
+            with app.app_context():
+                sync_similarity_index()
+                similarity_index.save()
+        except Exception as e:
+            print(f'⚠️ Similarity index save failed: {e}')
+        finally:
+            _similarity_save_lock.release()
+    
+    threading.Thread(target=save, name='similarity-index-save', daemon=True).start()
+
+@app.route('/api/similar-aliens/<int:alien_id>')
+@login_required
+def get_similar_aliens(alien_id):
+    """Get the aliens in the user's collection most similar to the given one"""
+    try:
+        # Verify alien belongs to current user
+        SavedAlien.query.filter_by(
+            id=alien_id,
+            user_id=current_user.id
+        ).first_or_404()
+        
+        k = min(max(request.args.get('k', 10, type=int), 1), 50)
+        
+        sync_similarity_index()
+        if similarity_index.needs_save:
+            save_similarity_index_async()
+        matches = similarity_index.similar(alien_id, k=k, user_id=current_user.id)
+        
+        aliens = {
+            alien.id: alien
+            for alien in SavedAlien.query.filter(SavedAlien.id.in_([alien_id for alien_id, _ in matches])).all()
+        }
+        
+        return jsonify([{
+            'id': aliens[match_id].id,
+            'planet_name': aliens[match_id].planet_name,
+            'planet_data': aliens[match_id].planet_data,
+            'alien_data': aliens[match_id].alien_data,
+            'image_url': aliens[match_id].image_url,
+            'created_at': aliens[match_id].created_at.isoformat(),
+            'similarity': score
+        } for match_id, score in matches if match_id in aliens]), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Whether the search table exists; only a positive answer is cached
+_search_available = False
+
+def search_available():
+    """Check for the search table on use, so it is found however the database was prepared.
+
+    `flask init-db` may have created it in another process, or this SQLite
+    build may lack FTS5, in which case it never appears.
+    """
+    global _search_available
+    if not _search_available:
+        _search_available = search_index_exists(db.session)
+    return _search_available
+
+@app.route('/api/search-aliens')
+@login_required
+def search_saved_aliens():
+    """Full-text search over the user's saved aliens with planet and survival score filters"""
+    if not search_available():
+        return jsonify({'error': 'Search is not available on this server'}), 503
+    try:
+        filters = {
+            f'{name}_{bound}': request.args.get(f'{name}_{bound}', type=float)
+            for name in ('gravity', 'temperature', 'score')
+            for bound in ('min', 'max')
+        }
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), 50)
+        
+        rows, total, total_capped = search_aliens(
+            db.session, current_user.id,
+            query=request.args.get('q', ''),
+            filters=filters,
+            page=page,
+            per_page=per_page
+        )
+        
+        aliens = {
+            alien.id: alien
+            for alien in SavedAlien.query.filter(SavedAlien.id.in_([row['id'] for row in rows])).all()
+        }
+        
+        return jsonify({
+            'results': [{
+                'id': aliens[row['id']].id,
+                'planet_name': aliens[row['id']].planet_name,
+                'planet_data': aliens[row['id']].planet_data,
+                'alien_data': aliens[row['id']].alien_data,
+                'image_url': aliens[row['id']].image_url,
+                'created_at': aliens[row['id']].created_at.isoformat(),
+                'relevance': round(row['relevance'], 4) if row['relevance'] is not None else None,
+                'best_score': row['best_score']
+            } for row in rows if row['id'] in aliens],
+            'total': total,
+            'total_capped': total_capped,
+            'page': page,
+            'per_page': per_page
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/saved-aliens')
 @login_required
 def saved_aliens():
@@ -431,18 +996,88 @@ def init_environments():
         }
     ]
     
+    # One query for all seeded names instead of one per environment
+    existing = {name for (name,) in db.session.query(ExtremeEnvironment.name)}
     for env_data in environments:
-        if not ExtremeEnvironment.query.filter_by(name=env_data['name']).first():
+        if env_data['name'] not in existing:
             env = ExtremeEnvironment(**env_data)
             db.session.add(env)
     
     db.session.commit()
 
-# Create database tables and initialize environments
-with app.app_context():
-    db.create_all()
-    init_environments()
+_database_ready = False
+_database_lock = threading.Lock()
+
+def init_database():
+    """Create database tables and seed environments once per process.
+
+    A file lock serializes workers that start together so only the first one
+    creates the schema; the rest find it in place.
+    """
+    with _database_lock:
+        if not _database_ready:
+            _init_database()
+
+def _init_database():
+    global _database_ready
+    os.makedirs(app.instance_path, exist_ok=True)
+    with open(os.path.join(app.instance_path, 'init.lock'), 'w') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            with app.app_context():
+                db.create_all()
+                # create_all skips tables that already exist, so add indexes introduced since.
+                # Names come from sqlite_master because reflection skips the search expression indexes.
+                existing = set(db.session.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+                db.session.remove()
+                for table in db.metadata.sorted_tables:
+                    for index in table.indexes:
+                        if index.name not in existing:
+                            index.create(bind=db.engine)
+                create_search_index(db.engine)
+                init_environments()
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    _database_ready = True
+
+@app.before_request
+def ensure_database():
+    """Prepare the database on the first request when the server skipped create_app().
+
+    `flask run` and `gunicorn app:app` serve the module's app directly, so
+    without this every route would fail on missing tables.
+    """
+    if not _database_ready:
+        init_database()
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create tables and seed extreme environments"""
+    init_database()
+    print('Database initialized')
+
+def create_app():
+    """Prepare the database and shared services, then return the app.
+
+    Point the WSGI server here (e.g. gunicorn 'app:create_app()' with
+    preload_app) so this runs once in the master before workers fork.
+    """
+    init_database()
+    
+    with app.app_context():
+        if os.getenv('PRELOAD_SERVICES', '1') == '1':
+            get_bioverse_app()
+            if sync_similarity_index():
+                similarity_index.save()
+        # Forked workers must not share the master's SQLite connections
+        db.engine.dispose()
+    
+    return app
 
 if __name__ == '__main__':
+    create_app()
     port = int(os.environ.get('PORT', 8000))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,224 @@
+import asyncio
+import base64
+import json
+from contextlib import asynccontextmanager
+
+import httpx
+
+from bioverse_app import BioVerseApp
+from rate_limiter import RateLimitExceeded
+
+
+def extract_json(content):
+    """Parse the outermost JSON object in an LLM reply"""
+    json_start = content.find('{')
+    json_end = content.rfind('}')
+    if json_start == -1 or json_end <= json_start:
+        raise Exception('No valid JSON found in response')
+    try:
+        return json.loads(content[json_start:json_end + 1])
+    except json.JSONDecodeError as e:
+        raise Exception(f'Invalid JSON in response: {e}')
+
+
+class AsyncBioVerseApp(BioVerseApp):
+    """asyncio variant of BioVerseApp.
+
+    Same prompts, provider pool and rate limiter, but every upstream call is
+    awaited on an httpx.AsyncClient and retries back off with asyncio.sleep,
+    so one event loop can keep hundreds of generations in flight. Rate
+    limiter transactions run on worker threads so they never block the loop.
+
+    It is meant for callers that run their own long-lived event loop, such
+    as batch jobs; pass a long-lived `client` there so connections are
+    reused. The Flask views stay on the sync engine.
+    Passing `shared` reuses a BioVerseApp's rate limiter and provider pool so
+    latency stats and limits are not split between the two.
+    """
+
+    def __init__(self, client=None, shared=None):
+        if shared is not None:
+            super().__init__(rate_limiter=shared.rate_limiter, llm_pool=shared.llm_pool)
+        else:
+            super().__init__()
+        self.client = client
+        # Loading the CA bundle takes a large share of opening a client, so do it once
+        self._ssl_context = httpx.create_ssl_context()
+
+    @asynccontextmanager
+    async def _http(self):
+        if self.client is not None:
+            yield self.client
+        else:
+            async with httpx.AsyncClient(verify=self._ssl_context) as client:
+                yield client
+
+    async def _chat(self, prompt, temperature, max_tokens):
+        body = {
+            "model": self.llm_model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        async with self._http() as client:
+            response = await self.llm_pool.chat_completion_async(body, client)
+        if response.status_code != 200:
+            raise Exception(f'API request failed with status {response.status_code}')
+        data = response.json()
+        if not data.get('choices'):
+            raise Exception('Invalid API response format')
+        return data['choices'][0]['message']['content']
+
+    async def _with_retries(self, label, attempt, max_retries, fallback=None):
+        """Run `attempt` with exponential backoff (1s, 2s, 4s, ...) between failures.
+
+        Returns `fallback()` after the last failure or a rate limit rejection
+        when one is given, otherwise re-raises.
+        """
+        for i in range(max_retries):
+            try:
+                return await attempt()
+            except Exception as e:
+                print(f'{label} attempt {i + 1} failed: {e}')
+                # A rate limit rejection already waited out the queue, so don't back off again
+                if i == max_retries - 1 or isinstance(e, RateLimitExceeded):
+                    if fallback is None:
+                        raise
+                    return fallback()
+                await asyncio.sleep(2 ** i)
+
+    async def analyze_planet(self, planet_name):
+        """Analyze planet characteristics using LLM API with retry logic"""
+        prompt = self._planet_prompt(planet_name)
+
+        async def attempt():
+            return extract_json(await self._chat(prompt, 0.7, 300))
+
+        return await self._with_retries('Planet analysis', attempt, max_retries=5)
+
+    async def generate_alien(self, planet_data):
+        """Generate alien species based on planet data using LLM API with retry logic"""
+        prompt = self._alien_prompt(planet_data)
+
+        async def attempt():
+            return extract_json(await self._chat(prompt, 0.7, 300))
+
+        return await self._with_retries('Alien generation', attempt, max_retries=5)
+
+    async def generate_image_prompt(self, planet_data, alien_data):
+        """Generate optimized image prompt using LLM for better image generation"""
+        prompt = self._image_prompt_prompt(planet_data, alien_data)
+
+        async def attempt():
+            return (await self._chat(prompt, 0.8, 200)).strip()
+
+        return await self._with_retries(
+            'Image prompt generation', attempt, max_retries=3,
+            fallback=lambda: self._fallback_image_prompt(planet_data)
+        )
+
+    async def analyze_survival(self, alien_data, environment):
+        """Analyze how an alien would survive in an extreme environment"""
+        prompt = self._survival_prompt(alien_data, environment)
+
+        async def attempt():
+            result = extract_json(await self._chat(prompt, 0.7, 500))
+            return {
+                'survival_score': result.get('survival_score', 50),
+                'analysis': result.get('analysis', 'Analysis not available'),
+                'narrative': result.get('narrative', 'Narrative not available')
+            }
+
+        return await self._with_retries(
+            'Survival analysis', attempt, max_retries=3,
+            fallback=lambda: self._fallback_survival(alien_data, environment)
+        )
+
+    async def generate_image(self, prompt):
+        """Generate alien image using image generation API with retry logic and fallback"""
+        if not self.image_generation_configured():
+            print("⚠️ Image generation API keys not configured, using fallback placeholder")
+            return self.PLACEHOLDER_IMAGE_URL
+
+        body = self._image_request_body(prompt)
+        headers = {
+            'Authorization': f'Bearer {self.image_api_key}',
+            'Content-Type': 'application/json'
+        }
+
+        max_retries = 3
+        async with self._http() as client:
+            for i in range(max_retries):
+                try:
+                    await self.rate_limiter.acquire_async('image_requests')
+                    response = await client.post(
+                        f'{self.image_base_url}/images/generations',
+                        json=body,
+                        headers=headers,
+                        timeout=30
+                    )
+                    if response.status_code != 200:
+                        print(f'❌ Image API error: {response.status_code} - {response.text}')
+                        continue
+
+                    data = response.json()
+                    temp_image_url = None
+                    if data.get('data') and data['data'][0].get('url'):
+                        temp_image_url = data['data'][0]['url']
+                    elif data.get('output'):
+                        temp_image_url = data['output'][0]
+                    if not temp_image_url:
+                        raise Exception('No valid image URL found in response')
+
+                    try:
+                        return await self.upload_image_to_imgbb(temp_image_url, client)
+                    except Exception as e:
+                        print(f'⚠️ IMGBB upload failed: {e}, using temporary URL')
+                        return temp_image_url
+
+                except RateLimitExceeded as e:
+                    print(f'⏳ Image generation rate limited: {e}')
+                    break
+                except httpx.TimeoutException:
+                    print(f'⏰ Image generation timeout on attempt {i + 1}')
+                except Exception as e:
+                    print(f'❌ Image generation error: {e}')
+
+        print('🔄 Using fallback placeholder image')
+        return self.PLACEHOLDER_IMAGE_URL
+
+    async def upload_image_to_imgbb(self, image_url, client):
+        """Upload image to IMGBB to get a permanent link"""
+        image_response = await client.get(image_url, timeout=30)
+        image_response.raise_for_status()
+
+        upload_response = await client.post(
+            "https://api.imgbb.com/1/upload",
+            data={
+                "key": self.imgbb_api_key,
+                "image": base64.b64encode(image_response.content).decode('utf-8')
+            },
+            timeout=30
+        )
+        upload_response.raise_for_status()
+
+        upload_data = upload_response.json()
+        if upload_data.get('data') and upload_data['data'].get('url'):
+            return upload_data['data']['url']
+        raise Exception('No URL found in IMGBB response')
+
+    async def create_alien(self, planet_name):
+        """Run the whole planet -> alien -> image pipeline and return the combined result.
+
+        Each stage feeds the next, so they run in order; concurrency comes
+        from many pipelines sharing one event loop.
+        """
+        planet_data = await self.analyze_planet(planet_name)
+        alien_data = await self.generate_alien(planet_data)
+        image_prompt = await self.generate_image_prompt(planet_data, alien_data)
+        image_url = await self.generate_image(image_prompt)
+        return {
+            'planet': planet_data,
+            'alien': alien_data,
+            'image': image_url
+        }
@@ -0,0 +1,152 @@
+"""Drive many concurrent create_alien pipelines from one process.
+
+A stand-in LLM server in its own process answers every chat completion
+after 200ms.
+The sync BioVerseApp handles one pipeline at a time per thread, while
+AsyncBioVerseApp runs all of them on a single event loop.
+
+The last runs serve create-alien the way gunicorn's gthread workers do:
+each thread takes one request at a time and runs the view's two LLM calls
+on the sync engine, so throughput scales with the thread count.
+
+    python benchmarks/bench_async.py [concurrency] [threads...]
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LATENCY = 0.2
+
+PLANET = {'name': 'Kepler', 'gravity': 1.2, 'atmosphere': 'Thick CO2', 'temperature': 40,
+          'radiation': 'High', 'water': 'Oceans', 'dayLength': 30, 'yearLength': 400,
+          'description': 'A warm ocean world.'}
+ALIEN = {'name': 'Glider', 'description': 'A drifting filter feeder.', 'physicalTraits': ['fins', 'gills', 'shell'],
+         'abilities': ['glide', 'glow', 'filter'], 'scientificName': 'Aerofiltra keplerii'}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        prompt = request['messages'][0]['content']
+        if prompt.startswith('Analyze the planet'):
+            content = json.dumps(PLANET)
+        elif prompt.startswith('Create a scientifically accurate alien'):
+            content = json.dumps(ALIEN)
+        else:
+            content = 'A translucent drifting creature over a warm ocean.'
+        time.sleep(LATENCY)
+        body = json.dumps({'choices': [{'message': {'content': content}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def serve(port_queue):
+    server = StandInServer(('127.0.0.1', 0), StandInHandler)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def quiet(fn, *args):
+    # The pipelines print every stage; keep the benchmark output readable
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        return fn(*args)
+    finally:
+        sys.stdout = stdout
+
+
+async def run_async(concurrency):
+    import httpx
+    from async_bioverse_app import AsyncBioVerseApp
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits) as client:
+        engine = AsyncBioVerseApp(client=client)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(engine.create_alien(f'Planet {i}') for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    assert all(r['alien']['name'] == 'Glider' for r in results)
+    return elapsed
+
+
+def run_sync(count):
+    from bioverse_app import BioVerseApp
+
+    engine = BioVerseApp()
+    started = time.perf_counter()
+    for i in range(count):
+        engine.analyze_planet(f'Planet {i}')
+        engine.generate_alien(PLANET)
+        engine.generate_image_prompt(PLANET, ALIEN)
+        engine.generate_image('prompt')
+    return time.perf_counter() - started
+
+
+def run_views(count, threads):
+    from bioverse_app import BioVerseApp
+
+    engine = BioVerseApp()
+
+    def view(planet_name):
+        # The create-alien view's two LLM calls
+        planet_data = engine.analyze_planet(planet_name)
+        return engine.generate_alien(planet_data)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(view, (f'Planet {i}' for i in range(count))))
+    elapsed = time.perf_counter() - started
+    assert all(r['name'] == 'Glider' for r in results)
+    return elapsed
+
+
+if __name__ == '__main__':
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    thread_counts = [int(n) for n in sys.argv[2:]] or [8, 32]
+    port_queue = multiprocessing.Queue()
+    # A separate process keeps the server's threads off this process's GIL
+    server = multiprocessing.Process(target=serve, args=(port_queue,), daemon=True)
+    server.start()
+
+    os.environ.update({
+        'LLM_BASE_URL': f'http://127.0.0.1:{port_queue.get()}',
+        'LLM_PROVIDERS': '',
+        'IMAGE_API_KEY': '',
+        # Measure the engine itself, not the provider rate limits
+        'LLM_REQUESTS_PER_MINUTE': '0',
+        'LLM_TOKENS_PER_MINUTE': '0',
+        'IMAGES_PER_MINUTE': '0',
+    })
+
+    sync_count = 5
+    sync_elapsed = quiet(run_sync, sync_count)
+    print(f'sync:  {sync_count} pipelines in {sync_elapsed:.2f}s '
+          f'({sync_count / sync_elapsed:.1f}/s on one thread)')
+
+    async_elapsed = quiet(asyncio.run, run_async(concurrency))
+    print(f'async: {concurrency} concurrent pipelines in {async_elapsed:.2f}s '
+          f'({concurrency / async_elapsed:.1f}/s on one event loop)')
+
+    for threads in thread_counts:
+        view_count = threads * 10
+        view_elapsed = quiet(run_views, view_count, threads)
+        print(f'views: {view_count} requests on {threads} threads in {view_elapsed:.2f}s '
+              f'({view_count / view_elapsed:.1f}/s)')
@@ -0,0 +1,83 @@
+"""Compare LLM tail latency with and without hedged requests.
+
+Starts two local stand-in OpenAI-compatible servers that answer in 20ms
+but stall for 800ms on every 50th request they receive (2%), then sends the
+same workload through a ProviderPool with hedging disabled and enabled.
+Each pool is warmed up first so its latency window reflects steady state.
+Exits non-zero if hedging does not cut p99 at least in half.
+
+    python benchmarks/bench_hedging.py
+"""
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_router import Provider, ProviderPool  # noqa: E402
+
+WARMUP = 100
+REQUESTS = 500
+SLOW_EVERY = 50
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        # Deterministic stalls per server, independent of the pool's random routing
+        time.sleep(0.8 if next(self.server.counter) % SLOW_EVERY == SLOW_EVERY - 1 else 0.02)
+        body = json.dumps({'choices': [{'message': {'content': '{"ok": true}'}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.counter = itertools.count()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(urls, hedge_budget):
+    pool = ProviderPool(
+        [Provider(f'stand-in-{i}', url, model='stand-in') for i, url in enumerate(urls)],
+        hedge_budget=hedge_budget,
+        default_hedge_delay=0.1
+    )
+    body = {'messages': [{'role': 'user', 'content': 'hi'}], 'max_tokens': 10}
+    for _ in range(WARMUP):
+        pool.chat_completion(body)
+    pool.hedges = pool.hedge_wins = 0
+
+    latencies = []
+    for _ in range(REQUESTS):
+        started = time.monotonic()
+        pool.chat_completion(body)
+        latencies.append(time.monotonic() - started)
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+
+    print(f'hedge_budget={hedge_budget:<4} p50={pct(50):6.1f}ms  p95={pct(95):6.1f}ms  '
+          f'p99={pct(99):6.1f}ms  hedges={pool.hedges} wins={pool.hedge_wins}')
+    return pct(99)
+
+
+if __name__ == '__main__':
+    servers = [start_server(), start_server()]
+    urls = [f'http://127.0.0.1:{s.server_address[1]}' for s in servers]
+    unhedged = run(urls, hedge_budget=0)
+    hedged = run(urls, hedge_budget=0.1)
+    assert hedged < unhedged / 2, f'hedging did not cut p99: {unhedged:.1f}ms -> {hedged:.1f}ms'
+    print(f'p99 {unhedged:.1f}ms -> {hedged:.1f}ms')
@@ -0,0 +1,87 @@
+"""Measure /api/search-aliens query times as one user's collection grows.
+
+Synthetic aliens are bulk-inserted into a scratch copy of the project, so
+the FTS5 index is filled by the same triggers save_alien relies on.
+
+    python benchmarks/bench_search.py [sizes...]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+PROJECT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT, 'benchmarks'))
+
+from bench_similarity import synthetic_alien  # noqa: E402
+
+QUERIES = (
+    # The synthetic vocabulary is small, so most words match a large share of the collection;
+    # a name lookup matches a handful of aliens at any size, like most real searches
+    ('name lookup', {'q': 'Species4242'}),
+    ('word', {'q': 'crystalline'}),
+    ('two words', {'q': 'armored burrowing'}),
+    ('prefix', {'q': 'biolum'}),
+    ('word + filters', {'q': 'venom', 'gravity_max': 1.5, 'temperature_min': 0}),
+    ('filters only', {'gravity_min': 2.5, 'temperature_max': -100}),
+    ('score range', {'q': 'gliding', 'score_min': 60}),
+)
+
+
+def fill(app_module, user_id, count, rng):
+    db, SavedAlien, EnvironmentExploration = app_module.db, app_module.SavedAlien, app_module.EnvironmentExploration
+    aliens = []
+    for i in range(count):
+        alien, planet = synthetic_alien(rng)
+        alien['scientificName'] = f'Genus{i % 500} species{i}'
+        planet['name'] = f'Planet {rng.randrange(10 ** 6)}'
+        aliens.append({'user_id': user_id, 'planet_name': planet['name'], 'planet_data': planet, 'alien_data': alien})
+    db.session.execute(db.insert(SavedAlien), aliens)
+    ids = db.session.scalars(db.select(SavedAlien.id).where(SavedAlien.user_id == user_id)).all()
+    db.session.execute(db.insert(EnvironmentExploration), [
+        {'saved_alien_id': alien_id, 'environment_id': 1, 'survival_score': rng.randrange(101)}
+        for alien_id in rng.sample(ids, len(ids) // 3)
+    ])
+    db.session.commit()
+
+
+if __name__ == '__main__':
+    sizes = [int(n) for n in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    scratch = os.path.join(tempfile.mkdtemp(), 'bioverse')
+    shutil.copytree(PROJECT, scratch, ignore=shutil.ignore_patterns('instance', '.git', 'benchmarks'))
+    os.chdir(scratch)
+    sys.path.insert(0, scratch)
+    os.environ['PRELOAD_SERVICES'] = '0'
+
+    import app as app_module
+    app_module.create_app()
+    rng = random.Random(1)
+
+    with app_module.app.app_context():
+        # A second user's aliens share the index, as they would in production
+        other = app_module.User(username='other', email='other@example.com', password_hash='x')
+        app_module.db.session.add(other)
+        app_module.db.session.commit()
+        fill(app_module, other.id, sizes[-1], rng)
+
+        for size in sizes:
+            user = app_module.User(username=f'user{size}', email=f'user{size}@example.com', password_hash='x')
+            app_module.db.session.add(user)
+            app_module.db.session.commit()
+            started = time.perf_counter()
+            fill(app_module, user.id, size, rng)
+            print(f'{size} aliens inserted and indexed in {time.perf_counter() - started:.1f}s')
+
+            for label, params in QUERIES:
+                filters = {k: v for k, v in params.items() if k != 'q'}
+                timings = []
+                for _ in range(50):
+                    started = time.perf_counter()
+                    rows, total, capped = app_module.search_aliens(
+                        app_module.db.session, user.id, query=params.get('q'), filters=filters
+                    )
+                    timings.append(time.perf_counter() - started)
+                timings.sort()
+                print(f"  {label:<15} matches={str(total) + ('+' if capped else ''):<6} p50={timings[25] * 1000:6.2f}ms p95={timings[47] * 1000:6.2f}ms")
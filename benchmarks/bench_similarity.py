@@ -0,0 +1,75 @@
+"""Measure similarity index build, reload and top-k query times on synthetic aliens.
+
+    python benchmarks/bench_similarity.py [count]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from similarity_index import SimilarityIndex  # noqa: E402
+
+WORDS = (
+    'crystalline armored translucent bioluminescent segmented tentacled gelatinous spined '
+    'radiation resistant heat absorbing pressure adapted silicon carapace membrane wings '
+    'burrowing gliding echolocation photosynthetic chemosynthetic magnetic sensing venom '
+    'camouflage regeneration hibernation swarm filter feeding thermal vents ice methane'
+).split()
+# Generated descriptions draw on a much wider vocabulary than the trait keywords above
+WORDS += [f'{word}{suffix}' for word in WORDS for suffix in ('ic', 'oid', 'ous', 'ive', 'al', 'ing')]
+
+
+def synthetic_alien(rng):
+    def phrase():
+        return ' '.join(rng.sample(WORDS, 3))
+
+    alien = {
+        'name': f'Species{rng.randrange(10 ** 6)}',
+        'description': ' '.join(rng.sample(WORDS, 12)),
+        'physicalTraits': [phrase() for _ in range(3)],
+        'abilities': [phrase() for _ in range(3)],
+    }
+    planet = {
+        'gravity': round(rng.uniform(0.1, 3.0), 2),
+        'temperature': rng.randrange(-200, 500),
+        'dayLength': rng.uniform(5, 2000),
+        'yearLength': rng.uniform(50, 50000),
+        'radiation': rng.choice(['Low', 'Moderate', 'High', 'Extreme']),
+    }
+    return alien, planet
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(1)
+    path = os.path.join(tempfile.mkdtemp(), 'similarity_index.pkl')
+
+    index = SimilarityIndex(path)
+    started = time.perf_counter()
+    for alien_id in range(1, count + 1):
+        alien, planet = synthetic_alien(rng)
+        index.add(alien_id, alien_id % 50, alien, planet)
+    print(f'build:  {count} aliens in {time.perf_counter() - started:.1f}s')
+
+    index.mark_synced(count)
+    started = time.perf_counter()
+    index.save()
+    print(f'save:   {time.perf_counter() - started:.2f}s, {os.path.getsize(path) / 1e6:.1f}MB')
+
+    reloaded = SimilarityIndex(path)
+    started = time.perf_counter()
+    reloaded.load()
+    print(f'load:   {time.perf_counter() - started:.2f}s')
+
+    for label, user_id in (('global', None), ('per-user', None if count < 50 else 7)):
+        timings = []
+        for _ in range(200):
+            alien_id = rng.randrange(1, count + 1)
+            started = time.perf_counter()
+            reloaded.similar(alien_id, k=10, user_id=user_id)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(f'query ({label}): p50={timings[100] * 1000:.2f}ms p95={timings[190] * 1000:.2f}ms')
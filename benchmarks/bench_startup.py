@@ -0,0 +1,73 @@
+"""Measure worker cold-start time: import, create_app(), the first request
+and building the engines the first generation needs.
+
+Each run happens in a fresh interpreter against a scratch copy of the
+project, first with an empty instance folder and then with the database
+already created, as every worker after the first one sees it. A last set
+of runs skips preloading (PRELOAD_SERVICES=0, as with `flask run`), so the
+engines are built lazily; a worker that hangs there fails the run.
+
+    python benchmarks/bench_startup.py [runs]
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+PROJECT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+app.app.test_client().get('/api/health')
+served = time.perf_counter()
+app.get_bioverse_app()
+app.get_image_executor()
+engines = time.perf_counter()
+print(json.dumps({
+    'import': imported - started,
+    'create_app': created - imported,
+    'first_request': served - created,
+    'engines': engines - served,
+    'total': engines - started,
+}))
+"""
+
+
+def run_worker(cwd, preload=True):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1', PRELOAD_SERVICES='1' if preload else '0')
+    output = subprocess.run(
+        [sys.executable, '-c', WORKER], cwd=cwd, env=env, capture_output=True, text=True, check=True, timeout=60
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(label, samples):
+    print(f'{label:<11}', '  '.join(
+        f'{phase}={min(s[phase] for s in samples) * 1000:7.1f}ms'
+        for phase in ('import', 'create_app', 'first_request', 'engines', 'total')
+    ))
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    scratch = os.path.join(tempfile.mkdtemp(), 'bioverse')
+    shutil.copytree(PROJECT, scratch, ignore=shutil.ignore_patterns('instance', '.git', 'benchmarks'))
+
+    cold = []
+    for _ in range(runs):
+        shutil.rmtree(os.path.join(scratch, 'instance'), ignore_errors=True)
+        cold.append(run_worker(scratch))
+    warm = [run_worker(scratch) for _ in range(runs)]
+    lazy = [run_worker(scratch, preload=False) for _ in range(runs)]
+
+    print(f'best of {runs} runs')
+    report('empty db', cold)
+    report('existing', warm)
+    report('no preload', lazy)
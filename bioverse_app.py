@@ -2,9 +2,13 @@ import requests
 import os
 import json
 import random
+from rate_limiter import RateLimiter, RateLimitExceeded
+from llm_router import ProviderPool
 
 class BioVerseApp:
-    def __init__(self):
+    PLACEHOLDER_IMAGE_URL = "https://via.placeholder.com/1024x1024/0a0a2e/00ffff?text=Alien+Creature"
+    
+    def __init__(self, rate_limiter=None, llm_pool=None):
         # API Configuration
         self.llm_base_url = os.getenv('LLM_BASE_URL', 'https://samuraiapi.in/v1')
         self.llm_api_key = os.getenv('LLM_API_KEY', '')
@@ -16,12 +20,139 @@ class BioVerseApp:
         
         # IMGBB API Configuration for permanent image hosting
         self.imgbb_api_key = os.getenv('IMGBB_API_KEY', '')
+        
+        # Shared token buckets so all workers together stay under provider limits
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        
+        # LLM_PROVIDERS adds more endpoints; otherwise the pool wraps LLM_BASE_URL alone
+        self.llm_pool = llm_pool if llm_pool is not None else ProviderPool.from_env(self.rate_limiter)
     
-    def analyze_planet(self, planet_name):
-        """Analyze planet characteristics using LLM API with retry logic"""
-        prompt = f"""Analyze the planet "{planet_name}" and provide detailed planetary characteristics in a compact JSON format.
+    def check_upstreams(self, timeout=2):
+        """Report whether the LLM providers and the image API can be reached"""
+        checks = {f'llm:{name}': ok for name, ok in self.llm_pool.probe(timeout).items()}
+        try:
+            requests.get(
+                f'{self.image_base_url}/models',
+                headers={'Authorization': f'Bearer {self.image_api_key}'},
+                timeout=timeout
+            )
+            checks['image'] = True
+        except requests.exceptions.RequestException:
+            checks['image'] = False
+        return checks
+    
+    def image_generation_configured(self):
+        """Whether real images can be generated; otherwise generate_image returns the placeholder"""
+        return bool(self.image_api_key and self.imgbb_api_key)
+    
+    def _chat_completion(self, body):
+        """POST a chat completion through the provider pool, which throttles and hedges it"""
+        return self.llm_pool.chat_completion(body)
+    
+    # Prompt builders, shared with AsyncBioVerseApp
+    
+    def _planet_prompt(self, planet_name):
+        """Prompt asking the LLM for planetary characteristics as JSON"""
+        return f"""Analyze the planet "{planet_name}" and provide detailed planetary characteristics in a compact JSON format.
 Example: {{"name":"{planet_name}","gravity":0.38,"atmosphere":"Thin CO2","temperature":-63,"radiation":"High","water":"Polar Ice Caps","dayLength":24,"yearLength":687,"description":"A red, rocky planet with thin atmosphere and polar ice caps."}}
 """
+    
+    def _alien_prompt(self, planet_data):
+        """Prompt asking the LLM for an alien species adapted to the planet"""
+        return f"""Create a scientifically accurate alien species for planet {planet_data['name']} with these characteristics:
+Gravity: {planet_data['gravity']}g
+Atmosphere: {planet_data['atmosphere']}
+Temperature: {planet_data['temperature']}°C
+Radiation: {planet_data['radiation']}
+Water: {planet_data['water']}
+
+Provide the response in a compact JSON format with these exact keys:
+Example: {{"name":"AlienName","description":"Detailed description","physicalTraits":["trait1","trait2","trait3"],"abilities":["ability1","ability2","ability3"],"scientificName":"Genus species"}}
+"""
+    
+    def _image_prompt_prompt(self, planet_data, alien_data):
+        """Prompt asking the LLM to write an image generation prompt"""
+        return f"""Create a detailed, scientifically accurate image prompt for an alien creature specifically evolved for {planet_data['name']} with these exact conditions:
+
+PLANETARY CONDITIONS:
+- Gravity: {planet_data['gravity']}g
+- Temperature: {planet_data['temperature']}°C
+- Atmosphere: {planet_data['atmosphere']}
+- Radiation: {planet_data['radiation']}
+- Water: {planet_data['water']}
+
+ALIEN SPECIES:
+- Name: {alien_data['name']}
+- Description: {alien_data['description']}
+- Physical Traits: {', '.join(alien_data['physicalTraits'])}
+- Abilities: {', '.join(alien_data['abilities'])}
+
+GENERATE IMAGE PROMPT:
+Create a highly detailed, scientifically accurate image prompt for this alien creature. The prompt should:
+1. Be optimized for AI image generation (FLUX.1 model)
+2. Include specific visual details about morphology and adaptations
+3. Emphasize non-humanoid, truly alien characteristics
+4. Include lighting, texture, and environmental context
+5. Be 2-3 sentences maximum, highly descriptive
+6. Focus on unique biological adaptations for the specific planetary conditions
+7. Avoid any humanoid features, bipedal stance, or human-like elements
+
+Return ONLY the image prompt text, no JSON or additional formatting."""
+    
+    def _fallback_image_prompt(self, planet_data):
+        """Basic image prompt used when the LLM cannot write one"""
+        return f"Scientifically accurate non-humanoid alien creature specifically evolved for {planet_data['name']} with {planet_data['gravity']}g gravity, {planet_data['temperature']}°C, {planet_data['atmosphere']} atmosphere. Create a completely alien lifeform - no humanoid features, no bipedal stance, no human-like limbs or face. Instead, design a truly extraterrestrial organism with unique morphology adapted to these planetary conditions. Include visible adaptations for gravity, temperature, atmospheric composition, and radiation levels. The creature should be biologically plausible but utterly alien in appearance."
+    
+    def _survival_prompt(self, alien_data, environment):
+        """Prompt asking the LLM for a survival analysis as JSON"""
+        return f"""Analyze the survival of this alien species in the extreme environment:
+
+ALIEN SPECIES:
+Name: {alien_data['name']}
+Physical Traits: {', '.join(alien_data['physicalTraits'])}
+Abilities: {', '.join(alien_data['abilities'])}
+Description: {alien_data['description']}
+
+EXTREME ENVIRONMENT:
+Name: {environment.name}
+Type: {environment.type}
+Temperature: {environment.temperature}
+Atmosphere: {environment.atmosphere}
+Gravity: {environment.gravity}g
+Description: {environment.description}
+Challenges: {environment.challenges}
+
+Provide a detailed survival analysis in JSON format with:
+1. survival_score (0-100)
+2. analysis (detailed scientific analysis)
+3. narrative (engaging story of the alien's experience)
+
+Example: {{"survival_score":75,"analysis":"The alien's crystalline exoskeleton provides excellent protection against volcanic heat...","narrative":"As the alien descended into the volcanic world, its heat-resistant scales shimmered like molten metal..."}}
+"""
+    
+    def _image_request_body(self, prompt):
+        """Request body for the image generation API"""
+        return {
+            "prompt": prompt,
+            "model": self.image_model,
+            "n": 1,
+            "quality": "standard",
+            "response_format": "url",
+            "size": "1024x1024",
+            "style": "vivid"
+        }
+    
+    def _fallback_survival(self, alien_data, environment):
+        """Default survival analysis used when the LLM cannot provide one"""
+        return {
+            'survival_score': 50,
+            'analysis': f'Unable to analyze survival due to API limitations. Based on basic characteristics, this alien may face significant challenges in the {environment.name} environment.',
+            'narrative': f'The {alien_data["name"]} ventures into the {environment.name}, facing unknown challenges in this hostile world.'
+        }
+    
+    def analyze_planet(self, planet_name):
+        """Analyze planet characteristics using LLM API with retry logic"""
+        prompt = self._planet_prompt(planet_name)
         
         # Retry mechanism with exponential backoff
         max_retries = 5
@@ -36,16 +167,7 @@ Example: {{"name":"{planet_name}","gravity":0.38,"atmosphere":"Thin CO2","temper
                     "max_tokens": 300
                 }
                 
-                headers = {
-                    'Authorization': f'Bearer {self.llm_api_key}',
-                    'Content-Type': 'application/json'
-                }
-                
-                response = requests.post(
-                    f'{self.llm_base_url}/chat/completions',
-                    json=body,
-                    headers=headers
-                )
+                response = self._chat_completion(body)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -74,6 +196,9 @@ Example: {{"name":"{planet_name}","gravity":0.38,"atmosphere":"Thin CO2","temper
                 else:
                     raise Exception(f'API request failed with status {response.status_code}')
                     
+            except RateLimitExceeded:
+                # The limiter already queued us; backing off on top would only add latency
+                raise
             except Exception as e:
                 print(f'Planet analysis attempt {i + 1} failed: {e}')
                 
@@ -91,16 +216,7 @@ Example: {{"name":"{planet_name}","gravity":0.38,"atmosphere":"Thin CO2","temper
     
     def generate_alien(self, planet_data):
         """Generate alien species based on planet data using LLM API with retry logic"""
-        prompt = f"""Create a scientifically accurate alien species for planet {planet_data['name']} with these characteristics:
-Gravity: {planet_data['gravity']}g
-Atmosphere: {planet_data['atmosphere']}
-Temperature: {planet_data['temperature']}°C
-Radiation: {planet_data['radiation']}
-Water: {planet_data['water']}
-
-Provide the response in a compact JSON format with these exact keys:
-Example: {{"name":"AlienName","description":"Detailed description","physicalTraits":["trait1","trait2","trait3"],"abilities":["ability1","ability2","ability3"],"scientificName":"Genus species"}}
-"""
+        prompt = self._alien_prompt(planet_data)
         
         # Retry mechanism with exponential backoff
         max_retries = 5
@@ -115,16 +231,7 @@ Example: {{"name":"AlienName","description":"Detailed description","physicalTrai
                     "max_tokens": 300
                 }
                 
-                headers = {
-                    'Authorization': f'Bearer {self.llm_api_key}',
-                    'Content-Type': 'application/json'
-                }
-                
-                response = requests.post(
-                    f'{self.llm_base_url}/chat/completions',
-                    json=body,
-                    headers=headers
-                )
+                response = self._chat_completion(body)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -153,6 +260,9 @@ Example: {{"name":"AlienName","description":"Detailed description","physicalTrai
                 else:
                     raise Exception(f'API request failed with status {response.status_code}')
                     
+            except RateLimitExceeded:
+                # The limiter already queued us; backing off on top would only add latency
+                raise
             except Exception as e:
                 print(f'Alien generation attempt {i + 1} failed: {e}')
                 
@@ -170,32 +280,7 @@ Example: {{"name":"AlienName","description":"Detailed description","physicalTrai
     
     def generate_image_prompt(self, planet_data, alien_data):
         """Generate optimized image prompt using LLM for better image generation"""
-        prompt = f"""Create a detailed, scientifically accurate image prompt for an alien creature specifically evolved for {planet_data['name']} with these exact conditions:
-
-PLANETARY CONDITIONS:
-- Gravity: {planet_data['gravity']}g
-- Temperature: {planet_data['temperature']}°C
-- Atmosphere: {planet_data['atmosphere']}
-- Radiation: {planet_data['radiation']}
-- Water: {planet_data['water']}
-
-ALIEN SPECIES:
-- Name: {alien_data['name']}
-- Description: {alien_data['description']}
-- Physical Traits: {', '.join(alien_data['physicalTraits'])}
-- Abilities: {', '.join(alien_data['abilities'])}
-
-GENERATE IMAGE PROMPT:
-Create a highly detailed, scientifically accurate image prompt for this alien creature. The prompt should:
-1. Be optimized for AI image generation (FLUX.1 model)
-2. Include specific visual details about morphology and adaptations
-3. Emphasize non-humanoid, truly alien characteristics
-4. Include lighting, texture, and environmental context
-5. Be 2-3 sentences maximum, highly descriptive
-6. Focus on unique biological adaptations for the specific planetary conditions
-7. Avoid any humanoid features, bipedal stance, or human-like elements
-
-Return ONLY the image prompt text, no JSON or additional formatting."""
+        prompt = self._image_prompt_prompt(planet_data, alien_data)
 
         max_retries = 3
         base_delay = 1000
@@ -209,16 +294,7 @@ Return ONLY the image prompt text, no JSON or additional formatting."""
                     "max_tokens": 200
                 }
                 
-                headers = {
-                    'Authorization': f'Bearer {self.llm_api_key}',
-                    'Content-Type': 'application/json'
-                }
-                
-                response = requests.post(
-                    f'{self.llm_base_url}/chat/completions',
-                    json=body,
-                    headers=headers
-                )
+                response = self._chat_completion(body)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -230,9 +306,10 @@ Return ONLY the image prompt text, no JSON or additional formatting."""
             except Exception as e:
                 print(f'Image prompt generation attempt {i + 1} failed: {e}')
                 
-                if i == max_retries - 1:
+                # A rate limit rejection already waited out the queue, so fall back right away
+                if i == max_retries - 1 or isinstance(e, RateLimitExceeded):
                     # Fallback to basic prompt if all retries fail
-                    return f"Scientifically accurate non-humanoid alien creature specifically evolved for {planet_data['name']} with {planet_data['gravity']}g gravity, {planet_data['temperature']}°C, {planet_data['atmosphere']} atmosphere. Create a completely alien lifeform - no humanoid features, no bipedal stance, no human-like limbs or face. Instead, design a truly extraterrestrial organism with unique morphology adapted to these planetary conditions. Include visible adaptations for gravity, temperature, atmospheric composition, and radiation levels. The creature should be biologically plausible but utterly alien in appearance."
+                    return self._fallback_image_prompt(planet_data)
                 
                 delay = base_delay * (2 ** i)
                 import time
@@ -243,19 +320,11 @@ Return ONLY the image prompt text, no JSON or additional formatting."""
         print(f"Starting image generation with prompt: {prompt[:50]}...")
         
         # Check if API keys are configured
-        if not self.image_api_key or not self.imgbb_api_key:
+        if not self.image_generation_configured():
             print("⚠️ Image generation API keys not configured, using fallback placeholder")
-            return "https://via.placeholder.com/1024x1024/0a0a2e/00ffff?text=Alien+Creature"
+            return self.PLACEHOLDER_IMAGE_URL
         
-        body = {
-            "prompt": prompt,
-            "model": self.image_model,
-            "n": 1,
-            "quality": "standard",
-            "response_format": "url",
-            "size": "1024x1024",
-            "style": "vivid"
-        }
+        body = self._image_request_body(prompt)
         
         # Retry mechanism with shorter timeout
         max_retries = 3
@@ -264,6 +333,7 @@ Return ONLY the image prompt text, no JSON or additional formatting."""
         for i in range(max_retries):
             try:
                 print(f"Attempt {i+1} of {max_retries}...")
+                self.rate_limiter.acquire('image_requests')
                 headers = {
                     'Authorization': f'Bearer {self.image_api_key}',
                     'Content-Type': 'application/json'
@@ -306,6 +376,9 @@ Return ONLY the image prompt text, no JSON or additional formatting."""
                     if i == max_retries - 1:
                         break
                         
+            except RateLimitExceeded as e:
+                print(f'⏳ Image generation rate limited: {e}')
+                break
             except requests.exceptions.Timeout:
                 print(f'⏰ Image generation timeout on attempt {i+1}')
                 if i == max_retries - 1:
@@ -317,7 +390,7 @@ Return ONLY the image prompt text, no JSON or additional formatting."""
         
         # Fallback to placeholder if all attempts fail
         print('🔄 Using fallback placeholder image')
-        return "https://via.placeholder.com/1024x1024/0a0a2e/00ffff?text=Alien+Creature"
+        return self.PLACEHOLDER_IMAGE_URL
     
     def upload_image_to_imgbb(self, image_url):
         """Upload image to IMGBB to get a permanent link"""
@@ -360,30 +433,7 @@ Return ONLY the image prompt text, no JSON or additional formatting."""
 
     def analyze_survival(self, alien_data, environment):
         """Analyze how an alien would survive in an extreme environment"""
-        prompt = f"""Analyze the survival of this alien species in the extreme environment:
-
-ALIEN SPECIES:
-Name: {alien_data['name']}
-Physical Traits: {', '.join(alien_data['physicalTraits'])}
-Abilities: {', '.join(alien_data['abilities'])}
-Description: {alien_data['description']}
-
-EXTREME ENVIRONMENT:
-Name: {environment.name}
-Type: {environment.type}
-Temperature: {environment.temperature}
-Atmosphere: {environment.atmosphere}
-Gravity: {environment.gravity}g
-Description: {environment.description}
-Challenges: {environment.challenges}
-
-Provide a detailed survival analysis in JSON format with:
-1. survival_score (0-100)
-2. analysis (detailed scientific analysis)
-3. narrative (engaging story of the alien's experience)
-
-Example: {{"survival_score":75,"analysis":"The alien's crystalline exoskeleton provides excellent protection against volcanic heat...","narrative":"As the alien descended into the volcanic world, its heat-resistant scales shimmered like molten metal..."}}
-"""
+        prompt = self._survival_prompt(alien_data, environment)
         
         max_retries = 3
         base_delay = 1000
@@ -397,16 +447,7 @@ Example: {{"survival_score":75,"analysis":"The alien's crystalline exoskeleton p
                     "max_tokens": 500
                 }
                 
-                headers = {
-                    'Authorization': f'Bearer {self.llm_api_key}',
-                    'Content-Type': 'application/json'
-                }
-                
-                response = requests.post(
-                    f'{self.llm_base_url}/chat/completions',
-                    json=body,
-                    headers=headers
-                )
+                response = self._chat_completion(body)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -434,13 +475,10 @@ Example: {{"survival_score":75,"analysis":"The alien's crystalline exoskeleton p
             except Exception as e:
                 print(f'Survival analysis attempt {i + 1} failed: {e}')
                 
-                if i == max_retries - 1:
+                # A rate limit rejection already waited out the queue, so fall back right away
+                if i == max_retries - 1 or isinstance(e, RateLimitExceeded):
                     # Return default analysis if all retries fail
-                    return {
-                        'survival_score': 50,
-                        'analysis': f'Unable to analyze survival due to API limitations. Based on basic characteristics, this alien may face significant challenges in the {environment.name} environment.',
-                        'narrative': f'The {alien_data["name"]} ventures into the {environment.name}, facing unknown challenges in this hostile world.'
-                    }
+                    return self._fallback_survival(alien_data, environment)
                 
                 delay = base_delay * (2 ** i)
                 import time
@@ -0,0 +1,257 @@
+import hashlib
+import html
+import json
+import math
+import os
+import random
+import re
+import tempfile
+
+# Word starts in the traits that switch on a body feature (regex fragments)
+FEATURE_KEYWORDS = {
+    'wings': ('wing', 'glid', 'fly', 'flight', 'soar', 'airborne'),
+    'tentacles': ('tentacl', 'appendage', r'arms?\b', 'grasp', 'tendril'),
+    'armor': ('shell', 'armou?r', 'plate', 'carapace', 'scale', 'exoskeleton'),
+    'spines': ('spin', 'spike', 'thorn', 'quill', 'barb', 'horn'),
+    'glow': ('biolumin', 'glow', r'light(?!weight)', 'lumin', 'photo'),
+    'fins': (r'fins?\b', 'swim', 'aquatic', 'gill', 'fluke'),
+    'eyes': ('eye', 'vision', 'sight', 'ocul'),
+}
+_FEATURE_PATTERNS = {
+    feature: re.compile(r'\b(?:' + '|'.join(words) + ')') for feature, words in FEATURE_KEYWORDS.items()
+}
+
+RADIATION_LEVELS = (('extreme', 3), ('intense', 3), ('high', 2), ('strong', 2), ('moderate', 1), ('medium', 1))
+
+
+def _number(value, default):
+    """Leading number of values like 0.38, "1.2g" or "-200 to -150°C" """
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r'-?\d+(?:\.\d+)?', str(value or ''))
+    return float(match.group()) if match else default
+
+
+def content_hash(alien_data, planet_data):
+    """Stable hash of everything that shapes the rendered creature"""
+    alien_data = alien_data or {}
+    planet_data = planet_data or {}
+    key = {
+        'alien': {field: alien_data.get(field) for field in ('name', 'description', 'physicalTraits', 'abilities')},
+        'planet': {field: planet_data.get(field) for field in ('name', 'gravity', 'temperature', 'radiation')},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:32]
+
+
+def _features(alien_data):
+    text = ' '.join(
+        [str(alien_data.get('description', ''))]
+        + [str(t) for t in alien_data.get('physicalTraits') or []]
+        + [str(a) for a in alien_data.get('abilities') or []]
+    ).lower()
+    return {feature for feature, pattern in _FEATURE_PATTERNS.items() if pattern.search(text)}
+
+
+def _radiation_level(value):
+    text = str(value or '').lower()
+    for word, level in RADIATION_LEVELS:
+        if word in text:
+            return level
+    return 0
+
+
+def render_creature_svg(alien_data, planet_data):
+    """Draw a creature for the alien as a 512x512 SVG document.
+
+    The same alien and planet always give the same picture. Gravity sets the
+    body proportions (squat under high gravity, tall and long-legged under
+    low), temperature sets the palette from icy blues to molten reds, and
+    radiation adds markings and glow. Traits add wings, tentacles, armor
+    plates, spines, fins and extra eyes.
+    """
+    alien_data = alien_data or {}
+    planet_data = planet_data or {}
+    rng = random.Random(int(content_hash(alien_data, planet_data), 16))
+    features = _features(alien_data)
+
+    gravity = min(max(_number(planet_data.get('gravity'), 1.0), 0.05), 5.0)
+    temperature = _number(planet_data.get('temperature'), 15.0)
+    radiation = _radiation_level(planet_data.get('radiation'))
+
+    # Squatness runs from -1 (weightless) to 1 (crushing gravity)
+    squat = max(-1.0, min(1.0, math.log2(gravity) / 2))
+    body_rx = 95 * (1 + 0.35 * squat)
+    body_ry = 105 * (1 - 0.3 * squat)
+    leg_length = 80 * (1 - 0.45 * squat)
+    leg_width = 12 * (1 + 0.6 * squat)
+    cx = 256
+    # Stand every creature on the same ground line
+    cy = 450 - body_ry - leg_length
+
+    # Icy blue at -150°C through green to deep red at 350°C, jittered per creature
+    hue = max(0.0, min(210.0, 210 - (temperature + 150) / 500 * 210)) + rng.uniform(-12, 12)
+    light = f'hsl({hue:.0f}, 70%, 58%)'
+    base = f'hsl({hue:.0f}, 60%, 42%)'
+    dark = f'hsl({hue:.0f}, 55%, 24%)'
+    accent = f'hsl({(hue + 150 + rng.uniform(-20, 20)) % 360:.0f}, 85%, 60%)'
+    sky = f'hsl({(hue + 200) % 360:.0f}, 45%, 8%)'
+
+    parts = []
+
+    def add(element):
+        parts.append(element)
+
+    # Ground shadow
+    add(f'<ellipse cx="{cx}" cy="458" rx="{body_rx * 1.1:.0f}" ry="14" fill="#000" opacity="0.35"/>')
+
+    if 'wings' in features:
+        span = body_rx * (1.6 - 0.4 * squat)
+        for side in (-1, 1):
+            tip_x = cx + side * (body_rx + span)
+            add(
+                f'<path d="M{cx + side * body_rx * 0.4:.0f},{cy - body_ry * 0.3:.0f} '
+                f'Q{cx + side * (body_rx + span * 0.5):.0f},{cy - body_ry * 1.3:.0f} {tip_x:.0f},{cy - body_ry * 0.6:.0f} '
+                f'Q{cx + side * (body_rx + span * 0.4):.0f},{cy:.0f} {cx + side * body_rx * 0.5:.0f},{cy + body_ry * 0.2:.0f} Z" '
+                f'fill="{accent}" opacity="0.55" stroke="{light}" stroke-width="2"/>'
+            )
+
+    # Legs, or tentacles hanging below the body
+    limb_count = rng.choice((2, 4, 6)) if 'tentacles' not in features else rng.randint(4, 8)
+    for i in range(limb_count):
+        offset = (i + 0.5) / limb_count * 2 - 1
+        x = cx + offset * body_rx * 0.8
+        top = cy + body_ry * 0.7
+        bottom = cy + body_ry + leg_length
+        if 'tentacles' in features:
+            sway = rng.uniform(-30, 30)
+            add(
+                f'<path d="M{x:.0f},{top:.0f} C{x + sway:.0f},{top + leg_length * 0.4:.0f} {x - sway:.0f},{bottom - leg_length * 0.4:.0f} '
+                f'{x + sway * 0.5:.0f},{bottom:.0f}" stroke="{dark}" stroke-width="{leg_width:.0f}" fill="none" stroke-linecap="round"/>'
+            )
+        else:
+            knee_x = x + offset * leg_length * 0.35
+            add(
+                f'<polyline points="{x:.0f},{top:.0f} {knee_x:.0f},{(top + bottom) / 2:.0f} {x + offset * 10:.0f},{bottom:.0f}" '
+                f'stroke="{dark}" stroke-width="{leg_width:.0f}" fill="none" stroke-linecap="round" stroke-linejoin="round"/>'
+            )
+
+    if 'fins' in features:
+        for side in (-1, 1):
+            add(
+                f'<path d="M{cx + side * body_rx * 0.9:.0f},{cy:.0f} l{side * 45:.0f},-25 l{side * -10:.0f},55 Z" '
+                f'fill="{accent}" opacity="0.8"/>'
+            )
+
+    if 'spines' in features:
+        count = rng.randint(5, 9)
+        for i in range(count):
+            angle = math.pi * (1.15 + 0.7 * i / (count - 1))
+            x0 = cx + math.cos(angle) * body_rx * 0.95
+            y0 = cy + math.sin(angle) * body_ry * 0.95
+            length = rng.uniform(25, 45)
+            add(
+                f'<line x1="{x0:.0f}" y1="{y0:.0f}" x2="{x0 + math.cos(angle) * length:.0f}" '
+                f'y2="{y0 + math.sin(angle) * length:.0f}" stroke="{light}" stroke-width="5" stroke-linecap="round"/>'
+            )
+
+    # Body
+    glow = ' filter="url(#glow)"' if radiation >= 2 or 'glow' in features else ''
+    add(
+        f'<ellipse cx="{cx}" cy="{cy:.0f}" rx="{body_rx:.0f}" ry="{body_ry:.0f}" fill="url(#body)" '
+        f'stroke="{dark}" stroke-width="4"{glow}/>'
+    )
+
+    if 'armor' in features:
+        for i in range(4):
+            y = cy - body_ry * 0.35 + i * body_ry * 0.28
+            add(
+                f'<path d="M{cx - body_rx * 0.75:.0f},{y:.0f} Q{cx},{y + 22:.0f} {cx + body_rx * 0.75:.0f},{y:.0f}" '
+                f'stroke="{dark}" stroke-width="6" fill="none" opacity="0.7"/>'
+            )
+
+    # Radiation markings: more spots and stripes the harsher the sky
+    for _ in range(radiation * 5):
+        angle = rng.uniform(0, 2 * math.pi)
+        distance = rng.uniform(0.2, 0.8)
+        add(
+            f'<circle cx="{cx + math.cos(angle) * body_rx * distance:.0f}" cy="{cy + math.sin(angle) * body_ry * distance:.0f}" '
+            f'r="{rng.uniform(4, 11):.0f}" fill="{accent}" opacity="0.75"/>'
+        )
+    if radiation >= 2:
+        for i in range(3):
+            y = cy + body_ry * (0.15 + i * 0.2)
+            add(f'<line x1="{cx - body_rx * 0.6:.0f}" y1="{y:.0f}" x2="{cx + body_rx * 0.6:.0f}" y2="{y - 10:.0f}" stroke="{accent}" stroke-width="4" opacity="0.6"/>')
+
+    if 'glow' in features:
+        for _ in range(8):
+            add(
+                f'<circle cx="{cx + rng.uniform(-0.7, 0.7) * body_rx:.0f}" cy="{cy + rng.uniform(-0.7, 0.7) * body_ry:.0f}" '
+                f'r="3" fill="#fff" filter="url(#glow)"/>'
+            )
+
+    # Eyes
+    eye_count = rng.randint(3, 6) if 'eyes' in features else rng.randint(1, 3)
+    eye_y = cy - body_ry * 0.45
+    eye_r = max(8.0, 22 - eye_count * 2.5)
+    for i in range(eye_count):
+        x = cx + ((i + 0.5) / eye_count * 2 - 1) * body_rx * 0.5
+        y = eye_y + rng.uniform(-8, 8)
+        add(f'<circle cx="{x:.0f}" cy="{y:.0f}" r="{eye_r:.0f}" fill="#f8f8ff" stroke="{dark}" stroke-width="3"/>')
+        add(f'<circle cx="{x + rng.uniform(-3, 3):.0f}" cy="{y + 2:.0f}" r="{eye_r * 0.45:.0f}" fill="#0a0a1a"/>')
+
+    # Mouth
+    add(
+        f'<path d="M{cx - body_rx * 0.25:.0f},{cy + body_ry * 0.05:.0f} Q{cx},{cy + body_ry * (0.15 + rng.uniform(0, 0.15)):.0f} '
+        f'{cx + body_rx * 0.25:.0f},{cy + body_ry * 0.05:.0f}" stroke="{dark}" stroke-width="4" fill="none" stroke-linecap="round"/>'
+    )
+
+    stars = ''.join(
+        f'<circle cx="{rng.uniform(0, 512):.0f}" cy="{rng.uniform(0, 300):.0f}" r="{rng.uniform(0.5, 1.8):.1f}" fill="#fff" opacity="{rng.uniform(0.3, 0.9):.2f}"/>'
+        for _ in range(40)
+    )
+    title = html.escape(str(alien_data.get('name') or 'Alien creature'))
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 512 512" width="512" height="512">'
+        f'<title>{title}</title>'
+        '<defs>'
+        f'<radialGradient id="body" cx="40%" cy="35%" r="75%"><stop offset="0%" stop-color="{light}"/>'
+        f'<stop offset="60%" stop-color="{base}"/><stop offset="100%" stop-color="{dark}"/></radialGradient>'
+        '<filter id="glow" x="-50%" y="-50%" width="200%" height="200%"><feGaussianBlur stdDeviation="6" result="blur"/>'
+        '<feMerge><feMergeNode in="blur"/><feMergeNode in="SourceGraphic"/></feMerge></filter>'
+        '</defs>'
+        f'<rect width="512" height="512" fill="{sky}"/>{stars}'
+        f'<rect y="450" width="512" height="62" fill="{dark}" opacity="0.5"/>'
+        + ''.join(parts)
+        + '</svg>'
+    )
+
+
+class CreatureImageCache:
+    """Rendered creature SVGs on disk, keyed by content hash.
+
+    Identical aliens share one file, and the files never change, so they can
+    be served with long-lived cache headers.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, image_hash):
+        return os.path.join(self.directory, f'{image_hash}.svg')
+
+    def get_or_render(self, alien_data, planet_data):
+        """Return the content hash, rendering and storing the SVG if it is new"""
+        image_hash = content_hash(alien_data, planet_data)
+        path = self.path(image_hash)
+        if not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            # A unique temp file per call: threads of one worker may render the same alien at once
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(render_creature_svg(alien_data, planet_data))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        return image_hash
@@ -0,0 +1,24 @@
+# Run with: gunicorn -c gunicorn.conf.py
+import os
+
+wsgi_app = 'app:create_app()'
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+
+# A generation spends nearly all its time waiting on the LLM, so each worker runs
+# many request threads; workers x threads is how many generations run at once
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+# Requests legitimately run for minutes: a few LLM calls of up to LLM_TIMEOUT (60s)
+# each, RATE_LIMIT_MAX_WAIT (15s) in the rate limit queue, or IDEMPOTENCY_WAIT_SECONDS
+# (120s) waiting on a duplicate. gthread workers keep reporting in while requests run,
+# so this only restarts a worker that has stopped responding altogether.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 180))
+# On restart, let in-flight requests finish (leaving no idempotency key in_progress)
+# and the image pool drain its queued jobs before workers are killed
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 180))
+
+# Import the app, create the schema and load shared services once in the master;
+# workers then fork with them already in memory
+preload_app = True
@@ -0,0 +1,393 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+
+from rate_limiter import estimate_tokens
+
+
+class Provider:
+    """One OpenAI-compatible chat completion endpoint with its latency and health history"""
+
+    # Consecutive failures before a provider is taken out of rotation, and for how long
+    FAILURE_THRESHOLD = 3
+    COOLDOWN_SECONDS = 30
+    # A hedge fires at the p95 latency, but never later than this multiple of the median
+    HEDGE_MEDIAN_MULTIPLE = 4.0
+
+    def __init__(self, name, base_url, api_key='', model='', window=200):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.model = model
+        self.latencies = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self.down_until
+
+    def record_success(self, latency):
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.FAILURE_THRESHOLD:
+                self.down_until = time.monotonic() + self.COOLDOWN_SECONDS
+                print(f'⚠️ LLM provider {self.name} marked unhealthy for {self.COOLDOWN_SECONDS}s')
+
+    def percentile(self, pct, min_samples=20):
+        """Latency percentile in seconds, or None until enough samples exist"""
+        with self._lock:
+            if len(self.latencies) < min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def hedge_delay(self, default):
+        """Seconds to wait for this provider before hedging.
+
+        A p95 over a short window is easily dominated by a few stalls, which
+        would push the threshold up to the stall time and stop hedging for
+        exactly the requests it should catch. Capping it at a multiple of the
+        median keeps it near the normal latency.
+        """
+        p95 = self.percentile(95)
+        if p95 is None:
+            return default
+        return min(p95, self.HEDGE_MEDIAN_MULTIPLE * self.percentile(50))
+
+    def stats(self):
+        p50, p95 = self.percentile(50, 1), self.percentile(95, 1)
+        return {
+            'name': self.name,
+            'base_url': self.base_url,
+            'model': self.model,
+            'healthy': self.healthy,
+            'requests': self.requests,
+            'failures': self.failures,
+            'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class ProviderPool:
+    """Latency-weighted routing over several LLM providers with hedged requests.
+
+    Each call goes to a provider picked with probability inversely
+    proportional to its recent latency, skipping over providers whose rate
+    limit has no room left while another's does. If that provider has not answered
+    by its own p95 (capped at a few times its median), the same request is sent to a second provider and the
+    first successful response wins. Hedges are capped at `hedge_budget` of
+    all requests so a slow period cannot double upstream load.
+    """
+
+    def __init__(self, providers, rate_limiter=None, hedge_budget=0.1, default_hedge_delay=2.0, timeout=60):
+        if not providers:
+            raise ValueError('At least one LLM provider is required')
+        self.providers = providers
+        self.rate_limiter = rate_limiter
+        self.hedge_budget = hedge_budget
+        self.default_hedge_delay = default_hedge_delay
+        self.timeout = timeout
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+        # Serializes the budget check, capacity check and count of each hedge
+        self._hedge_lock = threading.Lock()
+        # One thread per in-flight call: every request thread's primary plus room for hedges
+        self._executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix='llm-hedge')
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls, rate_limiter=None):
+        """Build the pool from LLM_PROVIDERS, falling back to the single LLM_BASE_URL provider.
+
+        LLM_PROVIDERS is a JSON list such as
+        [{"name": "primary", "base_url": "...", "api_key": "...", "model": "..."}, ...]
+        """
+        default_model = os.getenv('LLM_MODEL', 'groq/moonshotai/kimi-k2-instruct')
+        configured = os.getenv('LLM_PROVIDERS')
+        if configured:
+            providers = [
+                Provider(
+                    entry.get('name', f'provider-{index}'),
+                    entry['base_url'],
+                    entry.get('api_key', ''),
+                    entry.get('model', default_model)
+                )
+                for index, entry in enumerate(json.loads(configured))
+            ]
+        else:
+            providers = [Provider(
+                'default',
+                os.getenv('LLM_BASE_URL', 'https://samuraiapi.in/v1'),
+                os.getenv('LLM_API_KEY', ''),
+                default_model
+            )]
+
+        return cls(
+            providers,
+            rate_limiter=rate_limiter,
+            hedge_budget=float(os.getenv('LLM_HEDGE_BUDGET', 0.1)),
+            default_hedge_delay=float(os.getenv('LLM_HEDGE_DEFAULT_DELAY', 2.0)),
+            timeout=float(os.getenv('LLM_TIMEOUT', 60))
+        )
+
+    def choose(self, exclude=()):
+        """Pick a provider, weighting healthy ones by inverse recent latency"""
+        candidates = [p for p in self.providers if p not in exclude]
+        if not candidates:
+            return None
+        healthy = [p for p in candidates if p.healthy] or candidates
+
+        # Weight by median latency so a single stalled request does not starve a provider
+        medians = [p.percentile(50, min_samples=1) for p in healthy]
+        known = [m for m in medians if m is not None]
+        # Untried providers are treated as average so they still get traffic
+        fallback = sum(known) / len(known) if known else 1.0
+        weights = [1.0 / max(m if m is not None else fallback, 0.001) for m in medians]
+        return random.choices(healthy, weights=weights)[0]
+
+    def ranked(self):
+        """All providers in a weighted random order: healthy ones first, as choose() would pick them"""
+        order = []
+        while len(order) < len(self.providers):
+            order.append(self.choose(exclude=order))
+        return order
+
+    def _throttle(self, provider, body, blocking=True):
+        if self.rate_limiter is None:
+            return True
+        tokens = estimate_tokens(body)
+        if blocking:
+            self.rate_limiter.acquire('llm_requests', provider.name)
+            self.rate_limiter.acquire('llm_tokens', provider.name, cost=tokens)
+            return True
+        return self.rate_limiter.try_acquire_all([
+            ('llm_requests', provider.name, 1),
+            ('llm_tokens', provider.name, tokens),
+        ])
+
+    async def _throttle_async(self, provider, body):
+        if self.rate_limiter is None:
+            return
+        await self.rate_limiter.acquire_async('llm_requests', provider.name)
+        await self.rate_limiter.acquire_async('llm_tokens', provider.name, cost=estimate_tokens(body))
+
+    @staticmethod
+    def _request_args(provider, body):
+        headers = {'Content-Type': 'application/json'}
+        # httpx rejects a bare "Bearer " header, so omit it for keyless local endpoints
+        if provider.api_key:
+            headers['Authorization'] = f'Bearer {provider.api_key}'
+        return {
+            'url': f'{provider.base_url}/chat/completions',
+            'json': dict(body, model=provider.model or body.get('model')),
+            'headers': headers
+        }
+
+    @staticmethod
+    def _record_response(provider, response, started):
+        if response.status_code == 200:
+            provider.record_success(time.monotonic() - started)
+        elif response.status_code == 429 or response.status_code >= 500:
+            provider.record_failure()
+
+    def _session(self):
+        # requests.Session is not thread-safe; one per thread keeps provider connections alive
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _send(self, provider, body):
+        started = time.monotonic()
+        try:
+            response = self._session().post(timeout=self.timeout, **self._request_args(provider, body))
+        except Exception:
+            provider.record_failure()
+            raise
+        self._record_response(provider, response, started)
+        return response
+
+    async def _send_async(self, provider, body, client):
+        started = time.monotonic()
+        try:
+            response = await client.post(timeout=self.timeout, **self._request_args(provider, body))
+        except Exception:
+            provider.record_failure()
+            raise
+        self._record_response(provider, response, started)
+        return response
+
+    def _hedge_budget_left(self):
+        with self._lock:
+            # Allow one hedge of slack so a fresh pool can still hedge
+            return self.hedges + 1 <= self.hedge_budget * self.requests + 1
+
+    def _ready_provider(self, body):
+        """Take rate limit capacity from the first provider in weight order that has it right now.
+
+        Returns (provider, None) when one did, otherwise (None, provider to
+        queue on), so a request never waits behind one provider's limit
+        while another has room.
+        """
+        order = self.ranked()
+        candidates = [p for p in order if p.healthy] or order
+        for provider in candidates:
+            if self._throttle(provider, body, blocking=False):
+                return provider, None
+        return None, candidates[0]
+
+    def _start(self, primary):
+        """Count a request sent to `primary` and return how long to wait before hedging it"""
+        with self._lock:
+            self.requests += 1
+        return primary.hedge_delay(self.default_hedge_delay)
+
+    def _hedge_to(self, primary, body, hedge_delay):
+        """Pick a backup provider for a slow request, or None when hedging is not allowed"""
+        backup = self.choose(exclude=(primary,))
+        if backup is None or not backup.healthy or self.hedge_budget <= 0:
+            return None
+        with self._hedge_lock:
+            if not self._hedge_budget_left():
+                return None
+            # Hedges only use spare capacity; they never queue behind the rate limiter
+            if not self._throttle(backup, body, blocking=False):
+                return None
+            # Count the hedge only once it is certain to be sent
+            with self._lock:
+                self.hedges += 1
+        print(f'🔀 {primary.name} slower than {hedge_delay * 1000:.0f}ms, hedging to {backup.name}')
+        return backup
+
+    def chat_completion(self, body):
+        """Send a chat completion, hedging to a second provider when the first is slow"""
+        primary, queue_on = self._ready_provider(body)
+        if primary is None:
+            self._throttle(queue_on, body)
+            primary = queue_on
+        hedge_delay = self._start(primary)
+
+        primary_future = self._executor.submit(self._send, primary, body)
+        done, _ = wait([primary_future], timeout=hedge_delay)
+        if done:
+            return primary_future.result()
+
+        backup = self._hedge_to(primary, body, hedge_delay)
+        if backup is None:
+            return primary_future.result()
+
+        backup_future = self._executor.submit(self._send, backup, body)
+        pending = {primary_future, backup_future}
+        fallback_response = None
+        error = None
+
+        # Take the first successful answer; the loser finishes in the background
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if response.status_code == 200:
+                    if future is backup_future:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return response
+                fallback_response = response
+
+        if fallback_response is not None:
+            return fallback_response
+        raise error
+
+    async def chat_completion_async(self, body, client):
+        """asyncio version of chat_completion() using an httpx.AsyncClient"""
+        # The limiter's SQLite transactions can block, so keep them off the event loop
+        primary, queue_on = await asyncio.to_thread(self._ready_provider, body)
+        if primary is None:
+            await self._throttle_async(queue_on, body)
+            primary = queue_on
+        hedge_delay = self._start(primary)
+
+        primary_task = asyncio.ensure_future(self._send_async(primary, body, client))
+        done, _ = await asyncio.wait({primary_task}, timeout=hedge_delay)
+        if done:
+            return primary_task.result()
+
+        backup = await asyncio.to_thread(self._hedge_to, primary, body, hedge_delay)
+        if backup is None:
+            return await primary_task
+
+        backup_task = asyncio.ensure_future(self._send_async(backup, body, client))
+        pending = {primary_task, backup_task}
+        fallback_response = None
+        error = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    if response.status_code == 200:
+                        if task is backup_task:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return response
+                    fallback_response = response
+        finally:
+            # Unlike threads, the losing request can actually be cancelled
+            for task in pending:
+                task.cancel()
+
+        if fallback_response is not None:
+            return fallback_response
+        raise error
+
+    def probe(self, timeout=2):
+        """Check which providers are reachable; any HTTP answer counts, even an auth error"""
+        reachable = {}
+        for provider in self.providers:
+            try:
+                requests.get(
+                    f'{provider.base_url}/models',
+                    headers={'Authorization': f'Bearer {provider.api_key}'},
+                    timeout=timeout
+                )
+                reachable[provider.name] = True
+            except requests.exceptions.RequestException:
+                reachable[provider.name] = False
+        return reachable
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'providers': [p.stats() for p in self.providers]
+        }
@@ -0,0 +1,313 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request could not get capacity within the allowed queue time"""
+
+    def __init__(self, bucket, retry_after):
+        super().__init__(f'Rate limit exceeded for {bucket}, retry in {retry_after:.1f}s')
+        self.bucket = bucket
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Token-bucket rate limiter shared by every worker process on this machine.
+
+    Bucket state lives in a small SQLite file, so all gunicorn workers draw
+    from the same buckets. Callers that would exceed a limit are queued in
+    FIFO order per bucket for up to `max_wait` seconds instead of failing.
+    """
+
+    # Seconds after which a queued waiter that stopped polling is dropped
+    STALE_WAITER_SECONDS = 2.0
+
+    def __init__(self, db_path=None, limits=None, max_wait=None):
+        default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'rate_limits.db')
+        self.db_path = db_path or os.getenv('RATE_LIMIT_DB', default_path)
+        self.limits = limits if limits is not None else self.default_limits()
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv('RATE_LIMIT_MAX_WAIT', 15))
+        self.poll_interval = 0.05
+        self._local = threading.local()
+        self._schema_ready = False
+
+    @staticmethod
+    def default_limits():
+        """Read bucket limits from the environment as (capacity, refill per second)"""
+        per_minute = {
+            'llm_requests': int(os.getenv('LLM_REQUESTS_PER_MINUTE', 60)),
+            'llm_tokens': int(os.getenv('LLM_TOKENS_PER_MINUTE', 60000)),
+            'image_requests': int(os.getenv('IMAGES_PER_MINUTE', 10)),
+            'user': int(os.getenv('USER_REQUESTS_PER_MINUTE', 10)),
+        }
+        # A limit of 0 disables that bucket
+        return {name: (limit, limit / 60.0) for name, limit in per_minute.items() if limit > 0}
+
+    def _connection(self):
+        # SQLite connections must not cross a fork, so reconnect in each new process
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        if not self._schema_ready:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS waiters (
+                    ticket INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL,
+                    heartbeat REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_waiters_key ON waiters (key, ticket);
+                CREATE TABLE IF NOT EXISTS stats (
+                    bucket TEXT PRIMARY KEY,
+                    acquired INTEGER NOT NULL DEFAULT 0,
+                    queued INTEGER NOT NULL DEFAULT 0,
+                    rejected INTEGER NOT NULL DEFAULT 0,
+                    total_wait REAL NOT NULL DEFAULT 0,
+                    max_wait REAL NOT NULL DEFAULT 0
+                );
+            """)
+            self._schema_ready = True
+        return conn
+
+    @staticmethod
+    def _available(conn, key, capacity, rate, now):
+        """Tokens in a bucket right now, refilled since its last update"""
+        row = conn.execute('SELECT tokens, updated_at FROM buckets WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return float(capacity)
+        return min(float(capacity), row[0] + (now - row[1]) * rate)
+
+    def _attempt(self, bucket, key, cost, ticket, queue=True):
+        """Run one atomic check of a bucket.
+
+        Returns (granted, ticket, wait, poll_in): `wait` estimates how long
+        until this caller gets its tokens, assuming those queued ahead want
+        as many, and `poll_in` is when to check again. A caller that is not
+        granted capacity keeps its ticket, which holds its place in the queue.
+        """
+        capacity, rate = self.limits[bucket]
+        cost = min(cost, capacity)
+        now = time.time()
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM waiters WHERE heartbeat < ?', (now - self.STALE_WAITER_SECONDS,))
+
+            tokens = self._available(conn, key, capacity, rate, now)
+
+            if ticket is None:
+                ahead = conn.execute('SELECT COUNT(*) FROM waiters WHERE key = ?', (key,)).fetchone()[0]
+            else:
+                ahead = conn.execute(
+                    'SELECT COUNT(*) FROM waiters WHERE key = ? AND ticket < ?', (key, ticket)
+                ).fetchone()[0]
+
+            if ahead == 0 and tokens >= cost:
+                conn.execute(
+                    'INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)',
+                    (key, tokens - cost, now)
+                )
+                if ticket is not None:
+                    conn.execute('DELETE FROM waiters WHERE ticket = ?', (ticket,))
+                conn.execute('COMMIT')
+                return True, None, 0.0, 0.0
+
+            wait = max(0.0, ((ahead + 1) * cost - tokens) / rate)
+            if not queue:
+                conn.execute('COMMIT')
+                return False, None, wait, wait
+
+            if ticket is None:
+                ticket = conn.execute(
+                    'INSERT INTO waiters (key, heartbeat) VALUES (?, ?)', (key, now)
+                ).lastrowid
+            else:
+                conn.execute('UPDATE waiters SET heartbeat = ? WHERE ticket = ?', (now, ticket))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        # The head of the queue checks back when its tokens should be there. Those
+        # behind it back off further the longer the line, so a full queue does not
+        # turn into a stream of write transactions; all still heartbeat in time.
+        if ahead == 0:
+            poll_in = max(self.poll_interval, wait)
+        else:
+            poll_in = max(self.poll_interval * 2 ** min(ahead, 5), (ahead * cost - tokens) / rate)
+        return False, ticket, wait, min(poll_in, self.STALE_WAITER_SECONDS / 2)
+
+    def _drop_waiter(self, ticket):
+        if ticket is not None:
+            self._connection().execute('DELETE FROM waiters WHERE ticket = ?', (ticket,))
+
+    def _record(self, bucket, waited, queued=False, rejected=False):
+        self._connection().execute("""
+            INSERT INTO stats (bucket, acquired, queued, rejected, total_wait, max_wait)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (bucket) DO UPDATE SET
+                acquired = acquired + excluded.acquired,
+                queued = queued + excluded.queued,
+                rejected = rejected + excluded.rejected,
+                total_wait = total_wait + excluded.total_wait,
+                max_wait = MAX(max_wait, excluded.max_wait)
+        """, (bucket, 0 if rejected else 1, 1 if queued else 0, 1 if rejected else 0, waited, waited))
+
+    @staticmethod
+    def _key(bucket, key):
+        return bucket if key is None else f'{bucket}:{key}'
+
+    def _acquire_steps(self, bucket, key, cost):
+        """Drive one queued acquisition, yielding how long to sleep between attempts.
+
+        Sleeping is left to the caller so the same queueing logic serves both
+        blocking and asyncio code. Returns the seconds spent waiting.
+        """
+        storage_key = self._key(bucket, key)
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        ticket = None
+        queued = False
+
+        while True:
+            granted, ticket, wait, poll_in = self._attempt(bucket, storage_key, cost, ticket)
+            if granted:
+                waited = time.monotonic() - started
+                self._record(bucket, waited, queued=queued)
+                if waited > 0.1:
+                    print(f'⏳ Rate limiter held {storage_key} for {waited * 1000:.0f}ms')
+                return waited
+
+            # Don't hold the caller for a wait that cannot end in time
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                self._drop_waiter(ticket)
+                self._record(bucket, time.monotonic() - started, queued=queued, rejected=True)
+                raise RateLimitExceeded(storage_key, wait)
+
+            queued = True
+            yield min(poll_in, max(remaining, 0.0))
+
+    def acquire(self, bucket, key=None, cost=1):
+        """Take `cost` tokens from a bucket, queueing until they are available.
+
+        `key` separates independent buckets sharing one limit, e.g. a user id.
+        Returns the seconds spent waiting; raises RateLimitExceeded when the
+        wait would exceed `max_wait`.
+        """
+        if bucket not in self.limits:
+            return 0.0
+
+        steps = self._acquire_steps(bucket, key, cost)
+        try:
+            while True:
+                time.sleep(next(steps))
+        except StopIteration as done:
+            return done.value
+
+    @staticmethod
+    def _step(steps):
+        # StopIteration cannot cross into a future, so report the outcome as a value
+        try:
+            return False, next(steps)
+        except StopIteration as done:
+            return True, done.value
+
+    async def acquire_async(self, bucket, key=None, cost=1):
+        """Like acquire(), but never blocks the event loop.
+
+        Each SQLite transaction, which may wait on the busy timeout, runs on
+        a worker thread, and the waits between them use asyncio.sleep.
+        """
+        if bucket not in self.limits:
+            return 0.0
+
+        steps = self._acquire_steps(bucket, key, cost)
+        while True:
+            finished, value = await asyncio.to_thread(self._step, steps)
+            if finished:
+                return value
+            await asyncio.sleep(value)
+
+    def try_acquire(self, bucket, key=None, cost=1):
+        """Take tokens only if they are available right now and nobody is queued"""
+        return self.try_acquire_all([(bucket, key, cost)])
+
+    def try_acquire_all(self, requests):
+        """Take tokens from several buckets at once, all or nothing.
+
+        `requests` is a list of (bucket, key, cost). Nothing is taken unless
+        every bucket has the capacity right now and nobody is queued on it,
+        so a refusal never leaves tokens spent in the buckets that had room.
+        """
+        wanted = [
+            (bucket, self._key(bucket, key), min(cost, self.limits[bucket][0]))
+            for bucket, key, cost in requests if bucket in self.limits
+        ]
+        if not wanted:
+            return True
+
+        now = time.time()
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            updates = []
+            for bucket, storage_key, cost in wanted:
+                capacity, rate = self.limits[bucket]
+                tokens = self._available(conn, storage_key, capacity, rate, now)
+                queued = conn.execute(
+                    'SELECT 1 FROM waiters WHERE key = ? AND heartbeat >= ? LIMIT 1',
+                    (storage_key, now - self.STALE_WAITER_SECONDS)
+                ).fetchone()
+                if queued or tokens < cost:
+                    conn.execute('COMMIT')
+                    return False
+                updates.append((storage_key, tokens - cost, now))
+            conn.executemany('INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)', updates)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        for bucket, _, _ in wanted:
+            self._record(bucket, 0.0)
+        return True
+
+    def stats(self):
+        """Return per-bucket acquisition and wait-time counters across all workers"""
+        rows = self._connection().execute(
+            'SELECT bucket, acquired, queued, rejected, total_wait, max_wait FROM stats ORDER BY bucket'
+        ).fetchall()
+        waiting = dict(self._connection().execute(
+            "SELECT substr(key, 1, instr(key || ':', ':') - 1), COUNT(*) FROM waiters GROUP BY 1"
+        ).fetchall())
+        return {
+            bucket: {
+                'limit_per_minute': round(self.limits[bucket][1] * 60) if bucket in self.limits else None,
+                'acquired': acquired,
+                'queued': queued,
+                'rejected': rejected,
+                'waiting_now': waiting.get(bucket, 0),
+                'avg_wait_ms': round(total_wait * 1000 / max(acquired + rejected, 1), 2),
+                'max_wait_ms': round(max_wait * 1000, 2),
+            }
+            for bucket, acquired, queued, rejected, total_wait, max_wait in rows
+        }
+
+
+def estimate_tokens(body):
+    """Rough token cost of a chat completion: ~4 characters per prompt token plus the completion budget"""
+    prompt_chars = sum(len(message.get('content', '')) for message in body.get('messages', []))
+    return prompt_chars // 4 + body.get('max_tokens', 0)
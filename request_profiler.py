@@ -0,0 +1,201 @@
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from flask import g, request
+
+
+class StackSampler:
+    """Sample the Python stacks of a set of threads on a fixed interval.
+
+    A background thread reads sys._current_frames() every `interval`
+    seconds and counts each distinct stack, which costs the profiled
+    threads nothing between samples. Threads can join while sampling runs,
+    e.g. the event loop thread an async view is executed on.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_ids = {thread_id}
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        # The last two path parts tell apart the many __init__.py files in site-packages
+        location = '/'.join(code.co_filename.replace('\\', '/').rsplit('/', 2)[-2:])
+        return f'{code.co_name} ({location}:{code.co_firstlineno})'.replace(';', ':')
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in tuple(self.thread_ids):
+                frame = frames.get(thread_id)
+                names = []
+                while frame is not None:
+                    names.append(self._frame_name(frame))
+                    frame = frame.f_back
+                if names:
+                    self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+
+class RequestProfiler:
+    """Opt-in per-request sampling profiler for the Flask app.
+
+    When enabled, a request is profiled if it carries an `X-Profile-Token`
+    header matching the configured token, or at random with probability
+    `sample_rate`. Each profile is written to `directory` as a
+    collapsed-stack file (one `frame;frame;... count` line per stack, which
+    flamegraph.pl and speedscope read directly) next to a JSON summary.
+    Only the newest `max_profiles` are kept.
+    """
+
+    TOKEN_HEADER = 'X-Profile-Token'
+
+    def __init__(self, directory, enabled=None, token=None, sample_rate=None, interval_ms=None, max_profiles=None):
+        self.directory = directory
+        self.enabled = enabled if enabled is not None else os.getenv('PROFILING_ENABLED', '0') == '1'
+        self.token = token if token is not None else os.getenv('PROFILING_TOKEN', '')
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+        interval_ms = interval_ms if interval_ms is not None else float(os.getenv('PROFILING_INTERVAL_MS', 5))
+        self.interval = interval_ms / 1000.0
+        self.max_profiles = max_profiles if max_profiles is not None else int(os.getenv('PROFILING_MAX_PROFILES', 200))
+
+    def init_app(self, app):
+        """Register the request hooks; call before other before_request handlers"""
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._abandon)
+
+        # Flask runs async views on an event loop in another thread, so have
+        # them add that thread to the sampler of the request they belong to
+        ensure_sync = app.ensure_sync
+
+        def profiled_ensure_sync(func):
+            if not iscoroutinefunction(func):
+                return ensure_sync(func)
+
+            @wraps(func)
+            async def join_sampler(*args, **kwargs):
+                sampler = g.get('_profile_sampler')
+                if sampler is not None:
+                    sampler.thread_ids.add(threading.get_ident())
+                return await func(*args, **kwargs)
+
+            return ensure_sync(join_sampler)
+
+        app.ensure_sync = profiled_ensure_sync
+
+    def is_authorized(self, token):
+        return bool(self.token) and hmac.compare_digest(token or '', self.token)
+
+    def _should_profile(self):
+        if not self.enabled or request.endpoint in (None, 'static'):
+            return False
+        if self.TOKEN_HEADER in request.headers:
+            return self.is_authorized(request.headers[self.TOKEN_HEADER])
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _start(self):
+        if not self._should_profile():
+            return
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        g._profile_sampler = sampler
+        g._profile_started = time.perf_counter()
+        sampler.start()
+
+    def _finish(self, response):
+        sampler = g.pop('_profile_sampler', None)
+        if sampler is None:
+            return response
+        duration = time.perf_counter() - g.pop('_profile_started')
+        sampler.stop()
+        try:
+            response.headers['X-Profile-Id'] = self._write(sampler, duration, response.status_code)
+        except Exception as e:
+            print(f'⚠️ Could not write request profile: {e}')
+        return response
+
+    def _abandon(self, error=None):
+        # after_request is skipped when the view raises; don't leave the sampler running
+        sampler = g.pop('_profile_sampler', None)
+        if sampler is not None:
+            sampler.stop()
+
+    def _write(self, sampler, duration, status_code):
+        os.makedirs(self.directory, exist_ok=True)
+        endpoint = re.sub(r'[^A-Za-z0-9_.-]', '_', request.endpoint or 'unknown')
+        # Threads of one worker can finish requests to the same endpoint in the same millisecond
+        profile_id = f'{int(time.time() * 1000)}-{os.getpid()}-{threading.get_native_id()}-{endpoint}'
+        with open(os.path.join(self.directory, f'{profile_id}.collapsed'), 'w') as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        summary = {
+            'id': profile_id,
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'samples': sampler.samples,
+            'interval_ms': sampler.interval * 1000,
+            'created_at': time.time(),
+        }
+        with open(os.path.join(self.directory, f'{profile_id}.json'), 'w') as f:
+            json.dump(summary, f)
+        self._prune()
+        return profile_id
+
+    def _summaries(self):
+        summaries = []
+        for name in os.listdir(self.directory) if os.path.isdir(self.directory) else ():
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    summaries.append(json.load(f))
+            except (OSError, ValueError):
+                # Another worker may be pruning or still writing it
+                continue
+        return summaries
+
+    def _prune(self):
+        summaries = sorted(self._summaries(), key=lambda s: s['created_at'], reverse=True)
+        for summary in summaries[self.max_profiles:]:
+            for suffix in ('.json', '.collapsed'):
+                try:
+                    os.remove(os.path.join(self.directory, summary['id'] + suffix))
+                except OSError:
+                    pass
+
+    def slowest(self, limit=20, endpoint=None):
+        """Summaries of the slowest kept profiles, optionally for one endpoint"""
+        summaries = [s for s in self._summaries() if endpoint is None or s['endpoint'] == endpoint]
+        summaries.sort(key=lambda s: s['duration_ms'], reverse=True)
+        return summaries[:limit]
+
+    def collapsed_path(self, profile_id):
+        """Path of a profile's collapsed-stack file, or None if it is unknown"""
+        if not re.fullmatch(r'[A-Za-z0-9_.-]+', profile_id):
+            return None
+        path = os.path.join(self.directory, f'{profile_id}.collapsed')
+        return path if os.path.exists(path) else None
@@ -0,0 +1,319 @@
+import hashlib
+import heapq
+import math
+import os
+import pickle
+import re
+import struct
+import threading
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows runs a single worker, so there is no other writer to wait for
+    fcntl = None
+
+# MinHash signature length, split into LSH bands of ROWS_PER_BAND values each
+NUM_PERM = 64
+ROWS_PER_BAND = 4
+NUM_BANDS = NUM_PERM // ROWS_PER_BAND
+MAX_HASH = (1 << 32) - 1
+_SIGNATURE_FORMAT = f'<{NUM_PERM}I'
+
+# Planet numerics compared directly, with the scale that counts as "one unit apart"
+NUMERIC_FIELDS = ('gravity', 'temperature', 'dayLength', 'yearLength')
+NUMERIC_SCALES = (0.5, 50.0, 1.0, 1.0)
+
+STOPWORDS = {
+    'the', 'and', 'with', 'for', 'that', 'its', 'are', 'from', 'this', 'which', 'their', 'into',
+    'can', 'has', 'have', 'allowing', 'allow', 'allows', 'while', 'through', 'them', 'they', 'of',
+}
+
+
+def _number(value):
+    """Pull the leading number out of values like -63, "0.38" or "-200 to -150°C" """
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r'-?\d+(?:\.\d+)?', str(value or ''))
+    return float(match.group()) if match else None
+
+
+def _words(text):
+    return [w for w in re.findall(r'[a-z]+', str(text).lower()) if len(w) > 2 and w not in STOPWORDS]
+
+
+def extract_features(alien_data, planet_data):
+    """Turn an alien and its planet into a set of tokens for MinHash.
+
+    Text fields contribute prefixed words; planet numerics are bucketed so
+    nearby values share a token.
+    """
+    alien_data = alien_data or {}
+    planet_data = planet_data or {}
+    tokens = set()
+
+    for trait in alien_data.get('physicalTraits') or []:
+        tokens.update('t:' + w for w in _words(trait))
+    for ability in alien_data.get('abilities') or []:
+        tokens.update('a:' + w for w in _words(ability))
+    tokens.update('d:' + w for w in _words(alien_data.get('description', '')))
+
+    gravity = _number(planet_data.get('gravity'))
+    if gravity is not None:
+        tokens.add(f'gravity:{round(gravity * 4)}')
+    temperature = _number(planet_data.get('temperature'))
+    if temperature is not None:
+        tokens.add(f'temperature:{round(temperature / 50)}')
+    for field in ('dayLength', 'yearLength'):
+        value = _number(planet_data.get(field))
+        if value is not None and value > 0:
+            tokens.add(f'{field}:{round(math.log10(value) * 2)}')
+    if planet_data.get('radiation'):
+        tokens.add('radiation:' + str(planet_data['radiation']).lower().split()[0])
+
+    return tokens
+
+
+@lru_cache(maxsize=65536)
+def _token_hashes(token):
+    # One extendable-output digest gives all NUM_PERM independent hash values at once
+    return struct.unpack(_SIGNATURE_FORMAT, hashlib.shake_128(token.encode('utf-8')).digest(NUM_PERM * 4))
+
+
+def minhash(tokens):
+    """MinHash signature of a token set as NUM_PERM 32-bit values"""
+    if not tokens:
+        return [MAX_HASH] * NUM_PERM
+    return list(map(min, zip(*map(_token_hashes, tokens))))
+
+
+def _numeric_vector(planet_data):
+    planet_data = planet_data or {}
+    values = []
+    for field in NUMERIC_FIELDS:
+        value = _number(planet_data.get(field))
+        if value is not None and field in ('dayLength', 'yearLength'):
+            value = math.log10(value) if value > 0 else None
+        values.append(float('nan') if value is None else value)
+    return values
+
+
+class SimilarityIndex:
+    """In-memory MinHash/LSH index over saved aliens.
+
+    Signatures, owners and planet numerics live in flat arrays indexed by
+    position, so 100k aliens take a few tens of MB. Banded LSH buckets
+    narrow a query to a candidate set, which is then ranked by estimated
+    Jaccard similarity blended with closeness of planet numerics.
+
+    `synced_id` is the coverage watermark: every alien in the database with
+    an id up to it is indexed. Only a catch-up from the database advances
+    it, since aliens added one at a time may skip ids other workers saved.
+    """
+
+    SAVE_EVERY = 100
+    FORMAT_VERSION = 2
+
+    def __init__(self, path):
+        self.path = path
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.ids = array('q')
+        self.user_ids = array('q')
+        self.signatures = array('I')
+        self.numerics = array('d')
+        self.positions = {}
+        self.user_positions = {}
+        self.synced_id = 0
+        self._buckets = [{} for _ in range(NUM_BANDS)]
+        self._unsaved = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _band_keys(signature):
+        return [
+            hash(tuple(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]))
+            for band in range(NUM_BANDS)
+        ]
+
+    def _index_position(self, position, signature):
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band]
+            existing = bucket.get(key)
+            # Singletons stay plain ints; only shared buckets pay for an array
+            if existing is None:
+                bucket[key] = position
+            elif isinstance(existing, int):
+                bucket[key] = array('I', (existing, position))
+            else:
+                existing.append(position)
+
+    def add(self, alien_id, user_id, alien_data, planet_data):
+        """Index one saved alien; re-adding a known id is a no-op"""
+        signature = minhash(extract_features(alien_data, planet_data))
+        with self._lock:
+            if alien_id in self.positions:
+                return
+            position = len(self.ids)
+            self.ids.append(alien_id)
+            self.user_ids.append(user_id)
+            self.signatures.extend(signature)
+            self.numerics.extend(_numeric_vector(planet_data))
+            self.positions[alien_id] = position
+            self.user_positions.setdefault(user_id, array('I')).append(position)
+            self._index_position(position, signature)
+            self._unsaved += 1
+
+    def missing(self, alien_ids):
+        """The ids among `alien_ids` that are not indexed yet"""
+        with self._lock:
+            return [alien_id for alien_id in alien_ids if alien_id not in self.positions]
+
+    def mark_synced(self, alien_id):
+        """Record that every alien with an id up to `alien_id` is indexed"""
+        with self._lock:
+            self.synced_id = max(self.synced_id, alien_id)
+
+    @property
+    def needs_save(self):
+        return self._unsaved >= self.SAVE_EVERY
+
+    def _signature(self, position):
+        return self.signatures[position * NUM_PERM:(position + 1) * NUM_PERM]
+
+    def _numeric_similarity(self, a, b):
+        total, count = 0.0, 0
+        for i, scale in enumerate(NUMERIC_SCALES):
+            x = self.numerics[a * len(NUMERIC_FIELDS) + i]
+            y = self.numerics[b * len(NUMERIC_FIELDS) + i]
+            if not (math.isnan(x) or math.isnan(y)):
+                total += abs(x - y) / scale
+                count += 1
+        return 1.0 / (1.0 + total / count) if count else 0.0
+
+    def _score(self, query_position, query_signature, position):
+        signature = self._signature(position)
+        jaccard = sum(1 for x, y in zip(query_signature, signature) if x == y) / NUM_PERM
+        return 0.8 * jaccard + 0.2 * self._numeric_similarity(query_position, position)
+
+    def similar(self, alien_id, k=10, user_id=None, max_candidates=500):
+        """Return up to k (alien_id, score) pairs most similar to an indexed alien.
+
+        `user_id` restricts results to one owner's collection.
+        """
+        with self._lock:
+            query_position = self.positions.get(alien_id)
+            if query_position is None:
+                return []
+            query_signature = self._signature(query_position)
+
+            collisions = Counter()
+            for band, key in enumerate(self._band_keys(query_signature)):
+                bucket = self._buckets[band].get(key)
+                if bucket is None:
+                    continue
+                collisions.update((bucket,) if isinstance(bucket, int) else bucket)
+            collisions.pop(query_position, None)
+
+            if user_id is not None:
+                candidates = [p for p in collisions if self.user_ids[p] == user_id]
+            else:
+                candidates = list(collisions)
+            # More shared bands means higher Jaccard, so keep the strongest candidates for exact scoring
+            if len(candidates) > max_candidates:
+                candidates = heapq.nlargest(max_candidates, candidates, key=collisions.__getitem__)
+
+            # Small collections may share no band with the query; scan them outright
+            if len(candidates) < k and user_id is not None:
+                owned = [p for p in self.user_positions.get(user_id, ()) if p != query_position]
+                if len(owned) <= max_candidates:
+                    candidates = owned
+
+            scored = heapq.nlargest(
+                k,
+                ((self._score(query_position, query_signature, p), p) for p in candidates)
+            )
+            return [(self.ids[p], round(score, 4)) for score, p in scored]
+
+    def _read_header(self, f):
+        header = pickle.load(f)
+        if header.get('version') != self.FORMAT_VERSION or header.get('num_perm') != NUM_PERM:
+            raise ValueError('incompatible similarity index file')
+        return header
+
+    def save(self):
+        """Write the index atomically so other workers can start from it.
+
+        Workers save under a file lock and only replace a file that covers
+        less of the database than they do, so a worker that is behind never
+        overwrites a fresher index. Returns whether the file was written.
+        """
+        with self._lock:
+            synced_id = self.synced_id
+            unsaved = self._unsaved
+            state = {
+                'ids': self.ids.tobytes(),
+                'user_ids': self.user_ids.tobytes(),
+                'signatures': self.signatures.tobytes(),
+                'numerics': self.numerics.tobytes(),
+            }
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(f'{self.path}.lock', 'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path, 'rb') as f:
+                        on_disk = self._read_header(f)['synced_id']
+                except Exception:
+                    on_disk = -1
+                written = synced_id > on_disk
+                if written:
+                    tmp_path = f'{self.path}.{os.getpid()}.tmp'
+                    with open(tmp_path, 'wb') as f:
+                        # The small header first lets writers compare coverage without unpickling the index
+                        header = {'version': self.FORMAT_VERSION, 'num_perm': NUM_PERM, 'synced_id': synced_id}
+                        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    os.replace(tmp_path, self.path)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        with self._lock:
+            self._unsaved -= unsaved
+        return written
+
+    def load(self):
+        """Load a saved index if present; returns False when starting empty"""
+        with self._lock:
+            self.loaded = True
+            if not os.path.exists(self.path):
+                return False
+            try:
+                with open(self.path, 'rb') as f:
+                    header = self._read_header(f)
+                    state = pickle.load(f)
+            except Exception as e:
+                print(f'⚠️ Ignoring similarity index at {self.path}: {e}')
+                return False
+
+            self._reset()
+            self.ids.frombytes(state['ids'])
+            self.user_ids.frombytes(state['user_ids'])
+            self.signatures.frombytes(state['signatures'])
+            self.numerics.frombytes(state['numerics'])
+            self.synced_id = header['synced_id']
+            for position, alien_id in enumerate(self.ids):
+                self.positions[alien_id] = position
+                self.user_positions.setdefault(self.user_ids[position], array('I')).append(position)
+                self._index_position(position, self._signature(position))
+            return True
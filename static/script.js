@@ -27,14 +27,24 @@ class BioVerseFrontend {
         
         this.showLoading(true);
         
+        // Retrying the same planet after a dropped connection reuses the key,
+        // so the server returns the first run's result instead of generating again
+        if (!this.createKey || this.createKeyPlanet !== planetName) {
+            this.createKey = this.newIdempotencyKey();
+            this.createKeyPlanet = planetName;
+        }
+        
         try {
             const response = await fetch('/api/create-alien', {
                 method: 'POST',
                 headers: {
-                    'Content-Type': 'application/json'
+                    'Content-Type': 'application/json',
+                    'Idempotency-Key': this.createKey
                 },
                 body: JSON.stringify({ planetName: planetName })
             });
+            // The server answered, so the next click is a new creation
+            this.createKey = null;
             
             if (!response.ok) {
                 const errorData = await response.json();
@@ -42,7 +52,7 @@ class BioVerseFrontend {
             }
             
             const data = await response.json();
-            this.displayResults(data.planet, data.alien, data.image);
+            this.displayResults(data.planet, data.alien, data.image, data.image_job);
         } catch (error) {
             console.error('Error:', error);
             this.showError('Failed to create alien after all retry attempts. Please try again.');
@@ -51,11 +61,14 @@ class BioVerseFrontend {
         }
     }
     
-    displayResults(planetData, alienData, imageUrl) {
+    displayResults(planetData, alienData, imageUrl, imageJob) {
         // Store current data for saving
         this.currentPlanet = planetData;
         this.currentAlien = alienData;
         this.currentImage = imageUrl;
+        this.currentImageJob = imageJob || null;
+        // One key per generated alien: repeated saves return the first saved row
+        this.saveKey = this.newIdempotencyKey();
         
         // Ultra creative entrance animation
         const results = document.getElementById('results');
@@ -132,6 +145,35 @@ class BioVerseFrontend {
         
         // Ultra creative animations
         this.ultraAnimateElements();
+        
+        // The procedural image is shown first; swap in the generated one when it is ready
+        if (imageJob) {
+            this.pollImageJob(imageJob);
+        }
+    }
+    
+    async pollImageJob(jobId) {
+        // Stop once another alien has been generated
+        while (this.currentImageJob === jobId) {
+            await new Promise(resolve => setTimeout(resolve, 3000));
+            if (this.currentImageJob !== jobId) return;
+            
+            try {
+                const response = await fetch(`/api/image-jobs/${jobId}`);
+                if (!response.ok) return;
+                const job = await response.json();
+                
+                if (job.status === 'completed' && this.currentImageJob === jobId) {
+                    this.currentImage = job.image_url;
+                    document.getElementById('alienImage').src = job.image_url;
+                    return;
+                }
+                if (job.status === 'failed') return;
+            } catch (error) {
+                // Network hiccup; keep the procedural image and try again
+                console.error('Error checking image job:', error);
+            }
+        }
     }
     
     ultraAnimateElements() {
@@ -209,6 +251,13 @@ class BioVerseFrontend {
         });
     }
     
+    newIdempotencyKey() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    }
+    
     showLoading(show) {
         document.getElementById('loading').style.display = show ? 'block' : 'none';
         document.getElementById('generateBtn').disabled = show;
@@ -235,12 +284,14 @@ class BioVerseFrontend {
             const response = await fetch('/api/save-alien', {
                 method: 'POST',
                 headers: {
-                    'Content-Type': 'application/json'
+                    'Content-Type': 'application/json',
+                    'Idempotency-Key': this.saveKey
                 },
                 body: JSON.stringify({
                     planet: this.currentPlanet,
                     alien: this.currentAlien,
-                    image: this.currentImage
+                    image: this.currentImage,
+                    image_job: this.currentImageJob
                 })
             });
             